@@ -1,181 +1,695 @@
+import json
 import random
-import copy
+import threading
+import time
+
+from position import Position, PIECE_NAMES, TYPE_MASK
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+from evaluation import Evaluation, DEFAULT_PIECE_VALUES, DEFAULT_PIECE_COUNT_BONUS
+from search_stats import SearchStats
+
+MAX_DEPTH = 64
+MAX_PLY = 128
+
+# Ordering scores: transposition move, then captures (MVV-LVA), then killer
+# moves, then quiet moves by history
+TT_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 28
+KILLER_SCORE = 1 << 26
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the time budget runs out
+    """
+
+# Per-process state of the parallel root search workers
+_worker_ai = None
+_worker_config = None
+_shared_alpha = None
+_shared_stop = None
+
+def _init_worker(shared_alpha, shared_stop):
+    global _shared_alpha, _shared_stop
+    _shared_alpha = shared_alpha
+    _shared_stop = shared_stop
+
+def _search_root_move(config, squares, move, depth, wall_deadline, timed=False):
+    """
+    Worker entry point: (value, counters) of one root move, the value being
+    None if the deadline passed. Raises the shared root alpha when the move
+    improves it. With timed the counters include phase timings.
+    """
+    global _worker_ai, _worker_config
+    if _worker_ai is None:
+        _worker_ai = ChessAI(None, config['color'], config['move_generator'], config['tt_size_mb'])
+    ai = _worker_ai
+    # Table entries stay valid across colors (they are stored from white's
+    # point of view) but not across weights, search options or new games
+    search_config = {key: value for key, value in config.items() if key != 'color'}
+    if search_config != _worker_config:
+        if _worker_config is not None:
+            ai.new_game()
+        _worker_config = search_config
+    ai.color = config['color']
+    ai.move_generator = config['move_generator']
+    ai.piece_values = config['piece_values']
+    ai.piece_count_bonus = config['piece_count_bonus']
+    ai.piece_square_tables = config['piece_square_tables']
+    ai.use_quiescence = config['use_quiescence']
+    ai.shared_stop = _shared_stop
+    ai.nodes = ai.qnodes = ai.cutoffs = ai.first_move_cutoffs = 0
+    if wall_deadline is not None:
+        ai.deadline = time.perf_counter() + (wall_deadline - time.time())
+
+    stats = SearchStats()
+    restore = stats.instrument(ai) if timed else None
+    table = ai.transposition_table
+    tt_probes, tt_hits = table.probes, table.hits
+    position = Position(squares)
+    ai.evaluation = ai.new_evaluation(position)
+    value = None
+    try:
+        ai.make_move(position, move)
+        value = ai.minimax(position, depth - 1, _shared_alpha.value - 1, float('inf'), False, 1)
+    except SearchTimeout:
+        pass
+    finally:
+        ai.deadline = None
+        if restore is not None:
+            restore()
+
+    counters = {
+        'nodes': ai.nodes,
+        'qnodes': ai.qnodes,
+        'cutoffs': ai.cutoffs,
+        'first_move_cutoffs': ai.first_move_cutoffs,
+        'tt_probes': table.probes - tt_probes,
+        'tt_hits': table.hits - tt_hits,
+        'timings': stats.timings,
+    }
+    if value is not None:
+        with _shared_alpha.get_lock():
+            if value > _shared_alpha.value:
+                _shared_alpha.value = value
+    return value, counters
 
 class ChessAI:
-    def __init__(self, board_instance, color):
+    def __init__(self, board_instance, color, move_generator=None, tt_size_mb=16, seed=None,
+                 use_quiescence=True, weights=None):
         self.board_instance = board_instance
         self.color = color
-        self.piece_values = {
-            'Pawn': 10,
-            'Knight': 30,
-            'Bishop': 30,
-            'Rook': 50,
-            'Queen': 90,
-            'King': 900
-        }
+        # Any callable (position, color) -> moves, e.g. bitboards.generate_moves
+        self.move_generator = move_generator or Position.generate_moves
+        self.transposition_table = TranspositionTable(tt_size_mb)
+        self.nodes = 0
+        self.qnodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.depth_reached = 0
+        self.iteration_nodes = []
+        self.last_stats = None
+        # SearchStats of the choose_best_move call in progress, if collected
+        self.current_stats = None
+        self.deadline = None
+        # stop() only acts on the search in progress; searching and stopped
+        # change under search_lock
+        self.search_lock = threading.Lock()
+        self.searching = False
+        self.stopped = False
+        # Called as on_iteration(depth, best_move, value) after every
+        # completed iterative deepening iteration
+        self.on_iteration = None
+        self.tt_size_mb = tt_size_mb
+        self.use_quiescence = use_quiescence
+        self.executor = None
+        self.shared_alpha = None
+        # Set by stop() so that the parallel search workers give up too
+        self.shared_stop = None
+        # Counts new_game() and load_weights() calls, so the parallel search
+        # workers know when to clear their own tables
+        self.generation = 0
+        # Only used to break ties between equally good root moves; a fixed
+        # seed makes the whole search reproducible
+        self.random = random.Random(seed)
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [0] * (2 * 64 * 64)
+        self.piece_values = dict(DEFAULT_PIECE_VALUES)
+        self.piece_count_bonus = DEFAULT_PIECE_COUNT_BONUS
+        self.piece_square_tables = None
+        self.evaluation = None
+        if weights is not None:
+            self.load_weights(weights)
 
-    def get_all_possible_moves(self, board1, board2, color):
-        """
-        Get all possible moves for a color, prioritizing captures
-        """
-        moves = []
-        capture_moves = []
-
-        for x in range(8):
-            for y in range(8):
-                piece = board1[x][y]
-                if piece and piece.color == color:
-                    piece_moves = piece.get_possible_moves(board1, (x, y))
-                    
-                    for move in piece_moves:
-                        dest_board1 = board1[move[0]][move[1]]
-                        dest_board2 = board2[move[0]][move[1]]
-
-                        if dest_board2:
-                            continue
-                        
-                        if dest_board1:
-                            capture_moves.append((x, y, move, 1))
-                            continue
-                        
-                        moves.append((x, y, move, 1))
-
-                        if not dest_board2:
-                            cross_board_move = (x, y, move, 2)
-                            moves.append(cross_board_move)
-        
-        return capture_moves if capture_moves else moves
+    def load_weights(self, path):
+        """
+        Load evaluation weights from a JSON file as written by tune.py:
+        piece_values, and optionally piece_count_bonus and
+        piece_square_tables
+        """
+        with open(path) as file:
+            weights = json.load(file)
+        self.piece_values = dict(weights['piece_values'])
+        self.piece_count_bonus = weights.get('piece_count_bonus', self.piece_count_bonus)
+        self.piece_square_tables = weights.get('piece_square_tables')
+        self.transposition_table.clear()
+        self.generation += 1
 
-    def evaluate_board(self, board1, board2):
+    def get_all_possible_moves(self, position, color):
         """
-        Evaluate board state with suicidal chess rules
+        Get all possible moves for a color on both boards, prioritizing captures
         """
-        score = 0
-        piece_count = {
-            self.color: 0,
-            'white' if self.color == 'black' else 'black': 0
-        }
+        return self.move_generator(position, color)
 
-        for board in [board1, board2]:
-            for x in range(8):
-                for y in range(8):
-                    piece = board[x][y]
-                    if piece:
-                        piece_count[piece.color] += 1
-                        
-                        value = self.piece_values[piece.name]
-                        score += value if piece.color == self.color else -value
-        
-        score += (piece_count['white' if self.color == 'black' else 'black'] - 
-                  piece_count[self.color]) * 50
-        
-        return score
+    def new_evaluation(self, position):
+        """
+        Incremental evaluation state (see evaluation.Evaluation) for a position
+        """
+        evaluation = Evaluation(self.piece_values, self.piece_count_bonus, self.piece_square_tables)
+        evaluation.reset(position)
+        return evaluation
 
-    def minimax(self, board1, board2, depth, alpha, beta, maximizing_player):
+    def evaluate_board(self, position):
+        """
+        Evaluate board state with suicidal chess rules (full scan; the search
+        uses the incrementally updated self.evaluation instead)
+        """
+        return self.new_evaluation(position).score(self.color)
+
+    def evaluate_batch(self, positions):
+        """
+        evaluate_board of many positions at once, as a NumPy array (needs
+        NumPy, see batch_eval.py)
+        """
+        from batch_eval import evaluate_positions
+
+        return evaluate_positions(positions, self.piece_values, self.piece_count_bonus,
+                                  self.piece_square_tables, self.color)
+
+    def make_move(self, position, move):
+        """
+        Make a move on the position and update the evaluation terms
+        """
+        undo = position.make_move(move)
+        self.evaluation.update(position, move, undo, 1)
+        return undo
+
+    def unmake_move(self, position, move, undo):
+        """
+        Undo make_move on the position and the evaluation terms
+        """
+        self.evaluation.update(position, move, undo, -1)
+        position.unmake_move(move, undo)
+
+    def out_of_time(self):
+        """
+        True once the deadline has passed or, in a parallel search worker,
+        the parent has been stopped
+        """
+        return time.perf_counter() >= self.deadline or (self.shared_stop is not None and self.shared_stop.value)
+
+    def probe_transposition(self, position):
+        """
+        Look up a position in the transposition table, with the score seen
+        from this AI's side
+        """
+        entry = self.transposition_table.probe(position.key)
+        if entry is None:
+            return None
+        _, depth, score, flag, best_move = entry
+        # Entries are stored from white's point of view so they stay valid
+        # whichever color the AI plays
+        if self.color == 'black':
+            score = -score
+            flag = (EXACT, UPPER, LOWER)[flag]
+        return depth, score, flag, best_move
+
+    def store_transposition(self, position, depth, score, alpha, beta, best_move):
+        """
+        Store a search result, classifying it against the (alpha, beta) window
+        """
+        if score <= alpha:
+            flag = UPPER
+        elif score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        if self.color == 'black':
+            score = -score
+            flag = (EXACT, UPPER, LOWER)[flag]
+        self.transposition_table.store(position.key, depth, score, flag, best_move)
+
+    def order_moves(self, position, moves, ply, tt_move=None):
+        """
+        Sort moves in place: transposition move, captures by MVV-LVA,
+        killer moves, then quiet moves by history score
+        """
+        squares = position.squares
+        piece_values = self.piece_values
+        killers = self.killers[ply]
+        history = self.history
+        scores = []
+
+        for move in moves:
+            x, y, end, board_number = move
+            base = 0 if board_number == 1 else 64
+            victim = squares[base + end[0] * 8 + end[1]]
+            if move == tt_move:
+                score = TT_MOVE_SCORE
+            elif victim:
+                attacker = squares[base + x * 8 + y]
+                score = (CAPTURE_SCORE + piece_values[PIECE_NAMES[victim & TYPE_MASK]] * 1024
+                         - piece_values[PIECE_NAMES[attacker & TYPE_MASK]])
+            elif move == killers[0]:
+                score = KILLER_SCORE + 1
+            elif move == killers[1]:
+                score = KILLER_SCORE
+            else:
+                score = history[(board_number - 1) * 4096 + (x * 8 + y) * 64 + end[0] * 8 + end[1]]
+            scores.append(score)
+
+        order = sorted(range(len(moves)), key=scores.__getitem__, reverse=True)
+        moves[:] = [moves[i] for i in order]
+
+    def record_cutoff(self, position, move, depth, ply):
+        """
+        Update killer moves and history after a quiet move caused a cutoff
+        """
+        x, y, end, board_number = move
+        base = 0 if board_number == 1 else 64
+        if position.squares[base + end[0] * 8 + end[1]]:
+            return
+
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        self.history[(board_number - 1) * 4096 + (x * 8 + y) * 64 + end[0] * 8 + end[1]] += depth * depth
+
+    def quiescence(self, position, alpha, beta, maximizing_player, ply):
+        """
+        Extend forced capture sequences past the horizon, with stand-pat
+        and delta pruning, so leaves are not scored mid-exchange
+        """
+        self.nodes += 1
+        self.qnodes += 1
+        if self.deadline is not None and not self.nodes & 1023 and self.out_of_time():
+            raise SearchTimeout()
+
+        stand_pat = self.evaluation.score(self.color)
+        if ply >= MAX_PLY - 1:
+            return stand_pat
+
+        if maximizing_player:
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+        else:
+            if stand_pat <= alpha:
+                return stand_pat
+            beta = min(beta, stand_pat)
+
+        current_color = self.color if maximizing_player else ('white' if self.color == 'black' else 'black')
+        possible_moves = self.get_all_possible_moves(position, current_color)
+        if not possible_moves:
+            return stand_pat
+
+        # Captures are forced whenever one exists, so the generator returns
+        # either only captures or only quiet moves
+        squares = position.squares
+        x, y, end, board_number = possible_moves[0]
+        if not squares[(0 if board_number == 1 else 64) + end[0] * 8 + end[1]]:
+            return stand_pat
+
+        self.order_moves(position, possible_moves, ply)
+        capture_gain = self.evaluation.capture_gain
+        best = stand_pat
+
+        for index, move in enumerate(possible_moves):
+            # The opponent may stand pat after the capture, so the score
+            # right after it bounds the value of the whole line
+            gain = capture_gain(position, move)
+            if maximizing_player:
+                if stand_pat + gain <= alpha:
+                    best = max(best, stand_pat + gain)
+                    continue
+            elif stand_pat - gain >= beta:
+                best = min(best, stand_pat - gain)
+                continue
+
+            undo = self.make_move(position, move)
+            eval = self.quiescence(position, alpha, beta, not maximizing_player, ply + 1)
+            self.unmake_move(position, move, undo)
+
+            if maximizing_player:
+                best = max(best, eval)
+                alpha = max(alpha, eval)
+            else:
+                best = min(best, eval)
+                beta = min(beta, eval)
+            if beta <= alpha:
+                self.cutoffs += 1
+                if index == 0:
+                    self.first_move_cutoffs += 1
+                break
+
+        return best
+
+    def minimax(self, position, depth, alpha, beta, maximizing_player, ply=0):
         """
         Minimax with alpha-beta pruning for Alice Chess with suicidal elements
         """
         current_color = self.color if maximizing_player else ('white' if self.color == 'black' else 'black')
+
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 1023 and self.out_of_time():
+            raise SearchTimeout()
         
         if depth == 0:
-            return self.evaluate_board(board1, board2)
+            if self.use_quiescence:
+                return self.quiescence(position, alpha, beta, maximizing_player, ply)
+            return self.evaluation.score(self.color)
+
+        alpha_original = alpha
+        beta_original = beta
+        tt_move = None
+        entry = self.probe_transposition(position)
+        if entry is not None:
+            entry_depth, score, flag, tt_move = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return score
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if beta <= alpha:
+                    return score
         
-        possible_moves = self.get_all_possible_moves(board1, board2, current_color)
+        possible_moves = self.get_all_possible_moves(position, current_color)
         
         if not possible_moves:
-            return self.evaluate_board(board1, board2)
+            return self.evaluation.score(self.color)
+
+        self.order_moves(position, possible_moves, ply, tt_move)
         
+        best_move = None
         if maximizing_player:
             max_eval = float('-inf')
-            for move in possible_moves:
-                board1_copy = copy.deepcopy(board1)
-                board2_copy = copy.deepcopy(board2)
-                
-                start = (move[0], move[1])
-                end = (move[2][0], move[2][1])
-                board_source = board1_copy if move[3] == 1 else board2_copy
-                board_dest = board2_copy if move[3] == 1 else board1_copy
-                
-                if board_dest[end[0]][end[1]] is not None:
-                    board_dest[end[0]][end[1]] = None
-                
-                piece = board_source[start[0]][start[1]]
-                board_source[start[0]][start[1]] = None
-                board_dest[end[0]][end[1]] = piece
-                
-                eval = self.minimax(board1_copy, board2_copy, depth - 1, alpha, beta, False)
-                max_eval = max(max_eval, eval)
+            for index, move in enumerate(possible_moves):
+                undo = self.make_move(position, move)
+                eval = self.minimax(position, depth - 1, alpha, beta, False, ply + 1)
+                self.unmake_move(position, move, undo)
+
+                if eval > max_eval:
+                    max_eval = eval
+                    best_move = move
                 alpha = max(alpha, eval)
                 
                 if beta <= alpha:
+                    self.cutoffs += 1
+                    if index == 0:
+                        self.first_move_cutoffs += 1
+                    self.record_cutoff(position, move, depth, ply)
                     break
             
+            self.store_transposition(position, depth, max_eval, alpha_original, beta_original, best_move)
             return max_eval
         else:
             min_eval = float('inf')
-            for move in possible_moves:
-                board1_copy = copy.deepcopy(board1)
-                board2_copy = copy.deepcopy(board2)
-                
-                start = (move[0], move[1])
-                end = (move[2][0], move[2][1])
-                board_source = board1_copy if move[3] == 1 else board2_copy
-                board_dest = board2_copy if move[3] == 1 else board1_copy
-                
-                if board_dest[end[0]][end[1]] is not None:
-                    board_dest[end[0]][end[1]] = None
-                
-                piece = board_source[start[0]][start[1]]
-                board_source[start[0]][start[1]] = None
-                board_dest[end[0]][end[1]] = piece
-                
-                eval = self.minimax(board1_copy, board2_copy, depth - 1, alpha, beta, True)
-                min_eval = min(min_eval, eval)
+            for index, move in enumerate(possible_moves):
+                undo = self.make_move(position, move)
+                eval = self.minimax(position, depth - 1, alpha, beta, True, ply + 1)
+                self.unmake_move(position, move, undo)
+
+                if eval < min_eval:
+                    min_eval = eval
+                    best_move = move
                 beta = min(beta, eval)
                 
                 if beta <= alpha:
+                    self.cutoffs += 1
+                    if index == 0:
+                        self.first_move_cutoffs += 1
+                    self.record_cutoff(position, move, depth, ply)
                     break
             
+            self.store_transposition(position, depth, min_eval, alpha_original, beta_original, best_move)
             return min_eval
 
-    def choose_best_move(self, depth=3):
+    def finish_root(self, position, depth, move_values):
         """
-        Choose the best move for Alice Chess with suicidal elements
+        Pick the best of the (move, value) pairs of a root search, breaking
+        ties with self.random, and store the result in the table
         """
-        board1 = self.board_instance.board1
-        board2 = self.board_instance.board2
-        
-        possible_moves = self.get_all_possible_moves(board1, board2, self.color)
-        
-        if not possible_moves:
-            return None
-        
-        best_move = None
+        best_moves = []
         best_value = float('-inf')
+        for move, value in move_values:
+            if value > best_value:
+                best_value = value
+                best_moves = [move]
+            elif value == best_value:
+                best_moves.append(move)
+
+        best_move = best_moves[0] if len(best_moves) == 1 else self.random.choice(best_moves)
+
+        self.store_transposition(position, depth, best_value, float('-inf'), float('inf'), best_move)
         
-        random.shuffle(possible_moves)
+        return best_move, best_value
+
+    def search_root(self, position, possible_moves, depth):
+        """
+        Search every root move to the given depth and return the best one
+        with its value
+        """
+        self.evaluation = self.new_evaluation(position)
+        move_values = []
+        best_value = float('-inf')
         
         for move in possible_moves:
-            board1_copy = copy.deepcopy(board1)
-            board2_copy = copy.deepcopy(board2)
-            
-            start = (move[0], move[1])
-            end = (move[2][0], move[2][1])
-            board_source = board1_copy if move[3] == 1 else board2_copy
-            board_dest = board2_copy if move[3] == 1 else board1_copy
+            undo = self.make_move(position, move)
+            # Scores are integers, so a window starting just below the best
+            # value still returns exact scores for moves that tie with it
+            move_value = self.minimax(position, depth - 1, best_value - 1, float('inf'), False, 1)
+            self.unmake_move(position, move, undo)
             
-            if board_dest[end[0]][end[1]] is not None:
-                board_dest[end[0]][end[1]] = None
-            
-            piece = board_source[start[0]][start[1]]
-            board_source[start[0]][start[1]] = None
-            board_dest[end[0]][end[1]] = piece
-            
-            move_value = self.minimax(board1_copy, board2_copy, depth - 1, float('-inf'), float('inf'), False)
-            
-            if move_value > best_value:
-                best_value = move_value
-                best_move = move
+            move_values.append((move, move_value))
+            best_value = max(best_value, move_value)
+
+        return self.finish_root(position, depth, move_values)
+
+    def stop(self):
+        """
+        Ask a running time-limited search (possibly in another thread) to
+        return the best move of its last completed iteration. Does nothing
+        when no search is running; returns whether one was.
+        """
+        with self.search_lock:
+            if not self.searching:
+                return False
+            self.stopped = True
+            if self.deadline is not None:
+                self.deadline = float('-inf')
+            if self.shared_stop is not None:
+                self.shared_stop.value = 1
+            return True
+
+    def new_game(self):
+        """
+        Forget the transposition table and move ordering heuristics
+        """
+        self.transposition_table.clear()
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [0] * (2 * 64 * 64)
+        self.generation += 1
+
+    def get_executor(self, workers):
+        """
+        Process pool for the parallel search, kept alive between moves
+        """
+        if self.executor is not None and self.executor._max_workers != workers:
+            self.close()
+        if self.executor is None:
+            # Imported here so the serial search does not load multiprocessing
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.shared_alpha = multiprocessing.Value('d', float('-inf'))
+            self.shared_stop = multiprocessing.Value('b', 0)
+            self.executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.shared_alpha, self.shared_stop)
+            )
+        return self.executor
+
+    def close(self):
+        """
+        Shut down the worker processes of the parallel search
+        """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+            self.shared_alpha = None
+            self.shared_stop = None
+
+    def search_root_parallel(self, position, possible_moves, depth, workers):
+        """
+        Same result as search_root, with root moves spread over worker
+        processes that share the root alpha bound
+        """
+        executor = self.get_executor(workers)
+        self.shared_alpha.value = float('-inf')
+        config = {
+            'color': self.color,
+            'move_generator': self.move_generator,
+            'tt_size_mb': self.tt_size_mb,
+            'piece_values': self.piece_values,
+            'piece_count_bonus': self.piece_count_bonus,
+            'piece_square_tables': self.piece_square_tables,
+            'use_quiescence': self.use_quiescence,
+            'generation': self.generation,
+        }
+        squares = bytes(position.squares)
+        wall_deadline = None
+        if self.deadline is not None:
+            wall_deadline = time.time() + (self.deadline - time.perf_counter())
+
+        # The first (best ordered) move is searched alone so the others start
+        # with a useful alpha bound
+        timed = self.current_stats is not None
+        futures = [executor.submit(_search_root_move, config, squares, possible_moves[0], depth,
+                                   wall_deadline, timed)]
+        futures[0].result()
+        futures += [
+            executor.submit(_search_root_move, config, squares, move, depth, wall_deadline, timed)
+            for move in possible_moves[1:]
+        ]
+
+        move_values = []
+        timed_out = False
+        for move, future in zip(possible_moves, futures):
+            value, counters = future.result()
+            self.nodes += counters['nodes']
+            self.qnodes += counters['qnodes']
+            self.cutoffs += counters['cutoffs']
+            self.first_move_cutoffs += counters['first_move_cutoffs']
+            if timed:
+                self.current_stats.add_worker(counters)
+            if value is None:
+                timed_out = True
+            move_values.append((move, value))
+        if timed_out:
+            raise SearchTimeout()
+
+        return self.finish_root(position, depth, move_values)
+
+    def choose_best_move(self, depth=None, time_limit=None, workers=None, collect_stats=False):
+        """
+        Choose the best move for Alice Chess with suicidal elements.
+
+        With time_limit (seconds) the search deepens iteratively, up to depth
+        if given, and returns the best move of the last completed iteration.
+        With workers > 1 root moves are searched in that many processes
+        (call close() to stop them). With collect_stats the result is a
+        (best_move, SearchStats) pair. A time-limited search can be ended
+        early from another thread with stop().
+        """
+        if not collect_stats:
+            return self.run_search(depth, time_limit, workers)
+
+        stats = SearchStats()
+        restore = stats.instrument(self)
+        self.current_stats = stats
+        start = time.perf_counter()
+        try:
+            best_move = self.run_search(depth, time_limit, workers)
+        finally:
+            self.current_stats = None
+            restore()
+            stats.collect(self, time.perf_counter() - start)
+        self.last_stats = stats
+        return best_move, stats
+
+    def run_search(self, depth, time_limit, workers):
+        """
+        Root search behind choose_best_move
+        """
+        with self.search_lock:
+            self.searching = True
+            self.stopped = False
+        try:
+            return self.iterate(depth, time_limit, workers)
+        finally:
+            with self.search_lock:
+                self.searching = False
+                self.stopped = False
+                self.deadline = None
+                if self.shared_stop is not None:
+                    self.shared_stop.value = 0
+
+    def iterate(self, depth, time_limit, workers):
+        """
+        Iterative deepening (or a single fixed-depth iteration) over the
+        root moves
+        """
+        position = self.board_instance.get_position()
+
+        self.nodes = 0
+        self.qnodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.depth_reached = 0
+        self.iteration_nodes = []
+        
+        if self.color == self.board_instance.current_player:
+            # Same moves the board already generated for its rule checks
+            possible_moves = list(self.board_instance.legal_moves())
+        else:
+            possible_moves = self.get_all_possible_moves(position, self.color)
+        
+        if not possible_moves:
+            return None
+        
+        entry = self.probe_transposition(position)
+        self.order_moves(position, possible_moves, 0, entry[3] if entry is not None else None)
+
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [score // 2 for score in self.history]
+
+        if workers and workers > 1:
+            search_root = lambda position, moves, depth: self.search_root_parallel(position, moves, depth, workers)
+        else:
+            search_root = self.search_root
+
+        if time_limit is None:
+            best_move = search_root(position, possible_moves, depth or 3)[0]
+            self.depth_reached = depth or 3
+            self.iteration_nodes.append(self.nodes)
+            return best_move
+
+        deadline = time.perf_counter() + time_limit
+        best_move = possible_moves[0]
+        for current_depth in range(1, (depth or MAX_DEPTH) + 1):
+            iteration_start = self.nodes
+            try:
+                best_move, value = search_root(position, possible_moves, current_depth)
+            except SearchTimeout:
+                break
+            self.depth_reached = current_depth
+            self.iteration_nodes.append(self.nodes - iteration_start)
+            if self.on_iteration is not None:
+                self.on_iteration(current_depth, best_move, value)
+
+            # The first iteration always completes; the next ones try the
+            # previous best move first and may be cut by the deadline
+            possible_moves.remove(best_move)
+            possible_moves.insert(0, best_move)
+            with self.search_lock:
+                # stop() may have run before the deadline was set
+                self.deadline = float('-inf') if self.stopped else deadline
+
+            if len(possible_moves) == 1 or self.stopped or time.perf_counter() >= deadline:
+                break
         
         return best_move
 
@@ -0,0 +1,336 @@
+"""
+Local HTTP analysis server: an asyncio front end handing position analysis
+requests to a pool of engine worker processes.
+
+    POST   /analyze        {"position": "startpos" | "<text>", "moves": [...],
+                            "depth": N, "movetime": MS, "timeout": MS, "id": "..."}
+    DELETE /analyze/<id>   cancel a queued or running request
+    GET    /stats          queue depth, counters and latency percentiles
+
+Every worker process keeps one ChessAI alive between requests. A request's
+timeout covers its time in the queue as well as the search; a cancelled or
+timed out search still answers with the best move of its last completed
+depth when it has one.
+
+    python analysis_server.py --port 8765 --workers 2
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ai import ChessAI
+from board import Board
+from position import Position, format_move, parse_move
+
+# Per-request state shared with the workers, one slot per request in flight
+PENDING = 0
+RUNNING = 1
+CANCELLED = 2
+
+DEFAULT_TIMEOUT_MS = 10000
+DEFAULT_MAX_QUEUE = 256
+# Extra wait for a worker after the request deadline before giving up on it
+TIMEOUT_GRACE = 1.0
+# How often a worker looks at the cancel flag of the request it runs
+CANCEL_POLL_INTERVAL = 0.02
+LATENCY_WINDOW = 1000
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+# Per-process state of the workers
+_worker_ai = None
+_states = None
+
+def _init_worker(states):
+    global _states
+    _states = states
+
+def _watch_cancel(ai, slot, done):
+    while not done.wait(CANCEL_POLL_INTERVAL):
+        # stop() is ignored until the search has started
+        if _states[slot] == CANCELLED and ai.stop():
+            return
+
+def _analyze(job):
+    """
+    Worker entry point: analyse one request and return its result dict
+    """
+    global _worker_ai
+    slot = job['slot']
+    with _states.get_lock():
+        if _states[slot] == CANCELLED:
+            return {'status': 'cancelled', 'bestmove': None}
+        _states[slot] = RUNNING
+
+    board = Board()
+    try:
+        if job['position'] != 'startpos':
+            board.set_position(Position.from_text(job['position']))
+        for text in job['moves']:
+            x, y, end, board_number = parse_move(text)
+            board.move_piece((x, y), end, board_number)
+    except ValueError as e:
+        return {'status': 'error', 'error': str(e)}
+
+    seconds = job['wall_deadline'] - time.time()
+    if job['movetime'] is not None:
+        seconds = min(seconds, job['movetime'] / 1000)
+    if seconds <= 0:
+        return {'status': 'timeout', 'bestmove': None}
+
+    if _worker_ai is None:
+        _worker_ai = ChessAI(board, board.current_player)
+    ai = _worker_ai
+    ai.board_instance = board
+    ai.color = board.current_player
+    last = {}
+    ai.on_iteration = lambda depth, move, value: last.update(depth=depth, score=value)
+
+    done = threading.Event()
+    watcher = threading.Thread(target=_watch_cancel, args=(ai, slot, done), daemon=True)
+    watcher.start()
+    start = time.perf_counter()
+    try:
+        best_move = ai.choose_best_move(depth=job['depth'], time_limit=seconds)
+    finally:
+        done.set()
+        watcher.join()
+
+    return {
+        'status': 'cancelled' if _states[slot] == CANCELLED else 'ok',
+        'bestmove': format_move(best_move) if best_move else None,
+        'depth': last.get('depth', 0),
+        'score': last.get('score'),
+        'nodes': ai.nodes,
+        'search_ms': round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a sorted list
+    """
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class AnalysisServer:
+    def __init__(self, workers=None, max_queue=DEFAULT_MAX_QUEUE):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        # Forked workers would inherit the sockets of open connections and
+        # keep them from closing, so workers are spawned
+        context = multiprocessing.get_context('spawn')
+        self.states = context.Array('b', max_queue)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.states,)
+        )
+        self.free_slots = list(range(max_queue))
+        # request id -> (slot, concurrent future)
+        self.requests = {}
+        self.ids = itertools.count(1)
+        self.counters = collections.Counter()
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def stats(self):
+        states = [self.states[slot] for slot, _ in self.requests.values()]
+        latencies = sorted(self.latencies)
+        return {
+            'workers': self.workers,
+            'queued': states.count(PENDING),
+            'running': states.count(RUNNING),
+            'in_flight': len(self.requests),
+            'counters': dict(self.counters),
+            'latency_ms': {
+                'p50': percentile(latencies, 0.50),
+                'p90': percentile(latencies, 0.90),
+                'p99': percentile(latencies, 0.99),
+                'max': latencies[-1] if latencies else None,
+            },
+        }
+
+    async def analyze(self, request):
+        """
+        (status code, body) of one analysis request
+        """
+        if not self.free_slots:
+            self.counters['rejected'] += 1
+            return 503, {'error': 'queue full'}
+        position = request.get('position', 'startpos')
+        moves = request.get('moves', [])
+        if not isinstance(position, str):
+            return 400, {'error': 'position must be a string'}
+        if not isinstance(moves, list) or not all(isinstance(move, str) for move in moves):
+            return 400, {'error': 'moves must be a list of strings'}
+        try:
+            timeout = float(request.get('timeout', DEFAULT_TIMEOUT_MS)) / 1000
+            job = {
+                'position': position,
+                'moves': moves,
+                'depth': int(request['depth']) if request.get('depth') is not None else None,
+                'movetime': float(request['movetime']) if request.get('movetime') is not None else None,
+                'wall_deadline': time.time() + timeout,
+            }
+        except (TypeError, ValueError) as e:
+            return 400, {'error': str(e)}
+        if job['depth'] is not None and job['depth'] < 1:
+            return 400, {'error': 'depth must be positive'}
+        if job['movetime'] is not None and not job['movetime'] > 0:
+            return 400, {'error': 'movetime must be positive'}
+        if not timeout > 0:
+            return 400, {'error': 'timeout must be positive'}
+        if job['depth'] is None and job['movetime'] is None:
+            job['depth'] = 3
+
+        request_id = str(request.get('id') or next(self.ids))
+        if request_id in self.requests:
+            return 400, {'error': f"request {request_id} already in flight"}
+        slot = self.free_slots.pop()
+        self.states[slot] = PENDING
+        job['slot'] = slot
+        start = time.perf_counter()
+        try:
+            future = self.executor.submit(_analyze, job)
+        except RuntimeError as e:
+            # BrokenProcessPool, or the pool already shut down
+            self.free_slots.append(slot)
+            self.counters['failed'] += 1
+            return 500, {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+        # The slot stays taken until the worker is done with it, even after
+        # the request has timed out
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self.free_slots.append, slot))
+        self.requests[request_id] = (slot, future)
+        self.counters['requests'] += 1
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                            timeout + TIMEOUT_GRACE)
+        except asyncio.TimeoutError:
+            self.cancel(request_id)
+            result = {'status': 'timeout', 'bestmove': None}
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+            result = {'status': 'cancelled', 'bestmove': None}
+        except Exception as e:
+            # A failing search or a broken worker pool
+            result = {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+        finally:
+            del self.requests[request_id]
+
+        latency = round((time.perf_counter() - start) * 1000, 1)
+        self.latencies.append(latency)
+        self.counters[result['status']] += 1
+        result['id'] = request_id
+        result['latency_ms'] = latency
+        if result['status'] == 'error':
+            return 400, result
+        if result['status'] == 'timeout':
+            return 504, result
+        if result['status'] == 'failed':
+            return 500, result
+        return 200, result
+
+    def cancel(self, request_id):
+        """
+        Cancel a request: drop it if still queued, otherwise flag its worker
+        to stop searching. Returns False for unknown ids.
+        """
+        if request_id not in self.requests:
+            return False
+        slot, future = self.requests[request_id]
+        with self.states.get_lock():
+            self.states[slot] = CANCELLED
+        future.cancel()
+        return True
+
+    async def route(self, method, path, body):
+        if path == '/analyze':
+            if method != 'POST':
+                return 405, {'error': 'use POST'}
+            try:
+                request = json.loads(body or b'{}')
+            except ValueError as e:
+                return 400, {'error': f"invalid JSON: {e}"}
+            if not isinstance(request, dict):
+                return 400, {'error': 'expected a JSON object'}
+            return await self.analyze(request)
+        if path.startswith('/analyze/'):
+            if method != 'DELETE':
+                return 405, {'error': 'use DELETE'}
+            if self.cancel(path[len('/analyze/'):]):
+                return 200, {'cancelled': True}
+            return 404, {'error': 'unknown request'}
+        if path == '/stats':
+            return 200, self.stats()
+        return 404, {'error': 'not found'}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            method, path, _ = request_line.decode('latin-1').split(' ', 2)
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            body = await reader.readexactly(length) if length else b''
+            status, payload = await self.route(method, path, body)
+        except (ValueError, asyncio.IncompleteReadError):
+            status, payload = 400, {'error': 'malformed request'}
+
+        data = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n"
+                     f"Connection: close\r\n\r\n".encode() + data)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local analysis server for Alice suicide chess")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE)
+    args = parser.parse_args()
+
+    server = AnalysisServer(args.workers, args.max_queue)
+    print(f"Serving on http://{args.host}:{args.port} with {server.workers} workers")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
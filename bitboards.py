@@ -0,0 +1,192 @@
+from pieces import (
+    ROOK_DIRECTIONS, BISHOP_DIRECTIONS, ROOK_RAYS, BISHOP_RAYS, KNIGHT_TARGETS, KING_TARGETS,
+    PAWN_CAPTURES
+)
+from position import TYPE_MASK, BLACK, MOVED, SIDE_TO_MOVE, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+
+FULL = (1 << 64) - 1
+
+# Bit x * 8 + y is square (x, y), the same layout as one half of a Position.
+# The masks are built from the move tables of pieces.py. Directions
+# increasing the square index find their first blocker with the lowest set
+# bit, the others with the highest.
+
+
+def _mask(squares):
+    mask = 0
+    for x, y in squares:
+        mask |= 1 << (x * 8 + y)
+    return mask
+
+
+def _ray_masks(direction):
+    """
+    Per square, the mask of the ray leaving it in direction (0 if none)
+    """
+    masks = []
+    for x in range(8):
+        for y in range(8):
+            first = (x + direction[0], y + direction[1])
+            rays = ROOK_RAYS[x * 8 + y] + BISHOP_RAYS[x * 8 + y]
+            masks.append(next((_mask(ray) for ray in rays if ray[0] == first), 0))
+    return masks
+
+
+RAYS = {direction: _ray_masks(direction) for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+POSITIVE_DIRECTIONS = frozenset(d for d in RAYS if d[0] * 8 + d[1] > 0)
+KNIGHT_ATTACKS = [_mask(targets) for targets in KNIGHT_TARGETS]
+KING_ATTACKS = [_mask(targets) for targets in KING_TARGETS]
+PAWN_ATTACKS = ([_mask(targets) for targets in PAWN_CAPTURES['white']],
+                [_mask(targets) for targets in PAWN_CAPTURES['black']])
+
+
+def slider_attacks(square, occupied, directions):
+    """
+    Squares reached from square along the given directions, stopping at
+    (and including) the first occupied square of each ray
+    """
+    attacks = 0
+    for direction in directions:
+        ray = RAYS[direction][square]
+        blockers = ray & occupied
+        if blockers:
+            if direction in POSITIVE_DIRECTIONS:
+                blocker = (blockers & -blockers).bit_length() - 1
+            else:
+                blocker = blockers.bit_length() - 1
+            ray ^= RAYS[direction][blocker]
+        attacks |= ray
+    return attacks
+
+
+class Bitboards:
+    """
+    One 64-bit mask per board, color and piece type, plus occupancy and
+    moved-piece masks, built from a Position.
+
+    The masks are rebuilt from the Position for every generation rather
+    than kept up to date by make/unmake, so this is a reference generator
+    for cross-checking (perft.py) and not faster than Position's own.
+    """
+
+    __slots__ = ('pieces', 'occupancy', 'moved')
+
+    def __init__(self):
+        # pieces[(board * 2 + color) * 8 + piece_type], board and color in {0, 1}
+        self.pieces = [0] * 32
+        self.occupancy = [0] * 4
+        self.moved = [0, 0]
+
+    @classmethod
+    def from_position(cls, position):
+        bitboards = cls()
+        pieces = bitboards.pieces
+        occupancy = bitboards.occupancy
+        moved = bitboards.moved
+        squares = position.squares
+        for index in range(SIDE_TO_MOVE):
+            code = squares[index]
+            if code:
+                board = index >> 6
+                bit = 1 << (index & 63)
+                side = board * 2 + (1 if code & BLACK else 0)
+                pieces[side * 8 + (code & TYPE_MASK)] |= bit
+                occupancy[side] |= bit
+                if code & MOVED:
+                    moved[board] |= bit
+        return bitboards
+
+    def generate_all_moves(self, color, skip_quiets=False):
+        """
+        Alice moves (x, y, (fx, fy), board) of a color as a pair of lists
+        (captures, quiet moves); with skip_quiets no more quiet moves are
+        collected once a capture is found
+        """
+        pieces = self.pieces
+        occupancy = self.occupancy
+        side = 1 if color == 'black' else 0
+        moves = []
+        capture_moves = []
+
+        for board in (0, 1):
+            own = occupancy[board * 2 + side]
+            enemy = occupancy[board * 2 + 1 - side]
+            occupied = own | enemy
+            other = 1 - board
+            # Alice rule: the destination must be empty on the other board
+            allowed = ~(occupancy[other * 2] | occupancy[other * 2 + 1]) & FULL
+            base = (board * 2 + side) * 8
+            board_number = board + 1
+
+            for piece_type in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+                bits = pieces[base + piece_type]
+                while bits:
+                    bit = bits & -bits
+                    bits ^= bit
+                    square = bit.bit_length() - 1
+
+                    if piece_type == PAWN:
+                        step = 8 if side else -8
+                        targets = PAWN_ATTACKS[side][square] & enemy
+                        push = square + step
+                        if 0 <= push < 64 and not occupied >> push & 1:
+                            targets |= 1 << push
+                        double = square + 2 * step
+                        if not self.moved[board] & bit and 0 <= double < 64 and not occupied >> double & 1:
+                            targets |= 1 << double
+                    elif piece_type == KNIGHT:
+                        targets = KNIGHT_ATTACKS[square] & ~own
+                    elif piece_type == KING:
+                        targets = KING_ATTACKS[square] & ~own
+                    else:
+                        if piece_type == ROOK:
+                            directions = ROOK_DIRECTIONS
+                        elif piece_type == BISHOP:
+                            directions = BISHOP_DIRECTIONS
+                        else:
+                            directions = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+                        targets = slider_attacks(square, occupied, directions) & ~own
+
+                    targets &= allowed
+                    captures = targets & enemy
+                    start = divmod(square, 8)
+                    while captures:
+                        target = captures & -captures
+                        captures ^= target
+                        capture_moves.append((start[0], start[1], divmod(target.bit_length() - 1, 8), board_number))
+                    if skip_quiets and capture_moves:
+                        continue
+                    quiets = targets & ~occupied
+                    while quiets:
+                        target = quiets & -quiets
+                        quiets ^= target
+                        moves.append((start[0], start[1], divmod(target.bit_length() - 1, 8), board_number))
+
+        return capture_moves, moves
+
+    def generate_moves(self, color):
+        """
+        Alice moves (x, y, (fx, fy), board) for a color, captures only when
+        any capture exists
+        """
+        capture_moves, moves = self.generate_all_moves(color, skip_quiets=True)
+        return capture_moves if capture_moves else moves
+
+
+def generate_moves(position, color=None):
+    """
+    Drop-in replacement for Position.generate_moves built on bitboards
+    """
+    if color is None:
+        color = position.side_to_move
+    return Bitboards.from_position(position).generate_moves(color)
+
+
+def generate_all_moves(position, color=None):
+    """
+    Drop-in replacement for Position.generate_all_moves, e.g. as
+    Board(move_generator=generate_all_moves)
+    """
+    if color is None:
+        color = position.side_to_move
+    return Bitboards.from_position(position).generate_all_moves(color)
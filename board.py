@@ -1,14 +1,100 @@
+from array import array
+
 from pieces import create_initial_board, Piece
+from position import Position, decode_piece
+
+# Registro compacto de un movimiento en un entero de 23 bits:
+# casilla origen (6), casilla destino (6), tablero (1), código de la pieza
+# movida (5) y código de la pieza capturada (5), como en Position
+RECORD_END_SHIFT = 6
+RECORD_BOARD_SHIFT = 12
+RECORD_PIECE_SHIFT = 13
+RECORD_CAPTURED_SHIFT = 18
+RECORD_SQUARE_MASK = 63
+RECORD_CODE_MASK = 31
+
+def encode_record(move, piece, captured):
+    """
+    Empaquetar un movimiento y los códigos de pieza movida y capturada
+    """
+    x, y, end, board_number = move
+    return (x * 8 + y
+            | (end[0] * 8 + end[1]) << RECORD_END_SHIFT
+            | (board_number - 1) << RECORD_BOARD_SHIFT
+            | piece << RECORD_PIECE_SHIFT
+            | captured << RECORD_CAPTURED_SHIFT)
+
+def decode_record(record):
+    """
+    Desempaquetar un registro en (movimiento, pieza, capturada)
+    """
+    start = record & RECORD_SQUARE_MASK
+    end = (record >> RECORD_END_SHIFT) & RECORD_SQUARE_MASK
+    move = (start >> 3, start & 7, (end >> 3, end & 7), ((record >> RECORD_BOARD_SHIFT) & 1) + 1)
+    return (move,
+            (record >> RECORD_PIECE_SHIFT) & RECORD_CODE_MASK,
+            (record >> RECORD_CAPTURED_SHIFT) & RECORD_CODE_MASK)
+
+def make_move(board1, board2, move):
+    """
+    Aplicar en el sitio un movimiento de Alicia (x, y, (fx, fy), tablero) y
+    devolver la información necesaria para deshacerlo con unmake_move
+    """
+    x, y, end, board_number = move
+    ex, ey = end
+    board = board1 if board_number == 1 else board2
+    other_board = board2 if board_number == 1 else board1
+
+    piece = board[x][y]
+    captured = board[ex][ey]
+    board[x][y] = None
+
+    transferred = other_board[ex][ey] is None
+    if transferred:
+        board[ex][ey] = None
+        other_board[ex][ey] = piece
+    else:
+        board[ex][ey] = piece
+
+    return piece, captured, transferred
+
+def unmake_move(board1, board2, move, undo):
+    """
+    Restaurar exactamente la posición anterior a make_move
+    """
+    x, y, end, board_number = move
+    ex, ey = end
+    board = board1 if board_number == 1 else board2
+    other_board = board2 if board_number == 1 else board1
+    piece, captured, transferred = undo
+
+    if transferred:
+        other_board[ex][ey] = None
+    board[ex][ey] = captured
+    board[x][y] = piece
 
 class Board:
-    def __init__(self):
+    def __init__(self, move_generator=None):
         self.board1 = create_initial_board()
         
         self.board2 = [[None for _ in range(8)] for _ in range(8)]
         
         self.current_player = 'white'
+
+        # Copia compacta de ambos tableros, actualizada en cada movimiento;
+        # su clave Zobrist identifica la posición para la caché de movimientos
+        self.position = Position.from_board(self)
+        # Generador de las reglas: (position, color) -> (capturas, resto),
+        # p. ej. bitboards.generate_all_moves
+        self.move_generator = move_generator or Position.generate_all_moves
+        self._moves_cache_key = None
+        self._moves_cache = None
         
-        self.move_history = []
+        # Un registro compacto por jugada y la clave Zobrist anterior a ella;
+        # redo_history guarda las jugadas deshechas por seek para rehacerlas
+        self.move_history = array('I')
+        self.key_history = array('Q')
+        self.redo_history = array('I')
         
         self.game_over = False
         self.winner = None
@@ -21,30 +107,97 @@ class Board:
         board = self.board1 if board_number == 1 else self.board2
         return board[x][y]
 
+    def get_position(self):
+        """
+        Obtener una copia compacta (Position) del estado de ambos tableros
+        """
+        return self.position.copy()
+
+    def copy(self):
+        """
+        Copia independiente del tablero; las piezas son compartidas e
+        inmutables, así que basta con copiar las filas
+        """
+        board = Board.__new__(Board)
+        board.__dict__.update(self.__dict__)
+        board.board1 = [row[:] for row in self.board1]
+        board.board2 = [row[:] for row in self.board2]
+        board.position = self.position.copy()
+        board.move_history = array('I', self.move_history)
+        board.key_history = array('Q', self.key_history)
+        board.redo_history = array('I', self.redo_history)
+        return board
+
+    def set_position(self, position):
+        """
+        Cargar ambos tableros y el turno desde una Position
+        """
+        self.board1, self.board2 = position.to_boards()
+        self.current_player = position.side_to_move
+        self.position = position.copy()
+        self.move_history = array('I')
+        self.key_history = array('Q')
+        self.redo_history = array('I')
+        self._invalidate_moves()
+
+    def _invalidate_moves(self):
+        self._moves_cache_key = None
+        self._moves_cache = None
+
+    def _generated_moves(self):
+        """
+        Capturas, movimientos sin captura y conjunto de movimientos legales
+        (las capturas si hay alguna) del jugador actual, calculados una sola
+        vez por posición
+        """
+        if self._moves_cache_key != self.position.key:
+            captures, quiets = self.move_generator(self.position, self.current_player)
+            self._moves_cache = (captures, quiets, frozenset(captures or quiets))
+            self._moves_cache_key = self.position.key
+        return self._moves_cache
+
+    def legal_moves(self):
+        """
+        Movimientos legales del jugador actual en ajedrez de Alicia suicida
+        (solo capturas si existe alguna), como tuplas (x, y, (fx, fy), tablero)
+        """
+        captures, quiets, _ = self._generated_moves()
+        return captures if captures else quiets
+
+    def has_forced_capture(self):
+        """
+        Verificar si el jugador actual está obligado a capturar (con el
+        generador por defecto se detiene en la primera captura si los
+        movimientos aún no están calculados)
+        """
+        if self._moves_cache_key == self.position.key or self.move_generator is not Position.generate_all_moves:
+            return bool(self._generated_moves()[0])
+        return self.position.has_capture(self.current_player)
+
+    def has_legal_move(self):
+        """
+        Verificar si el jugador actual tiene algún movimiento (con el
+        generador por defecto se detiene en el primero encontrado)
+        """
+        if self._moves_cache_key == self.position.key or self.move_generator is not Position.generate_all_moves:
+            captures, quiets, _ = self._generated_moves()
+            return bool(captures or quiets)
+        return self.position.has_move(self.current_player)
+
+    def legal_destinations(self, start, board_number):
+        """
+        Casillas destino legales de la pieza en start, para resaltarlas
+        """
+        return [
+            move[2] for move in self.legal_moves()
+            if move[0] == start[0] and move[1] == start[1] and move[3] == board_number
+        ]
+
     def is_valid_move(self, start, end, board_number):
         """
-        Verificar si un movimiento es válido
+        Verificar si un movimiento es legal, incluida la captura obligatoria
         """
-        board = self.board1 if board_number == 1 else self.board2
-        
-        piece = board[start[0]][start[1]]
-        
-        if piece is None:
-            return False
-        
-        if piece.color != self.current_player:
-            return False
-        
-        possible_moves = piece.get_possible_moves(board, start)
-        
-        if end not in possible_moves:
-            return False
-        
-        other_board = self.board2 if board_number == 1 else self.board1
-        if other_board[end[0]][end[1]] is not None:
-            return False
-        
-        return True
+        return (start[0], start[1], tuple(end), board_number) in self._generated_moves()[2]
 
     def move_piece(self, start, end, board_number):
         """
@@ -53,42 +206,41 @@ class Board:
         if not self.is_valid_move(start, end, board_number):
             raise ValueError("Movimiento inválido")
         
-        board = self.board1 if board_number == 1 else self.board2
-        
-        piece = board[start[0]][start[1]]
-        board[start[0]][start[1]] = None
-        board[end[0]][end[1]] = piece
-        
-        piece.has_moved = True
-        
-        self.move_history.append({
-            'piece': piece,
-            'start': start,
-            'end': end,
-            'board_number': board_number
-        })
-        
-        target_board_number = 2 if board_number == 1 else 1
-        self._transfer_to_other_board(end, target_board_number)
-        
-        self.current_player = 'black' if self.current_player == 'white' else 'white'
+        self._apply_move((start[0], start[1], tuple(end), board_number))
+        del self.redo_history[:]
         
         self._check_game_status()
         
         return True
 
-    def _transfer_to_other_board(self, position, target_board_number):
+    def _apply_move(self, move):
         """
-        Transferir una pieza a la misma posición en el otro tablero
+        Aplicar un movimiento y guardar su registro en el historial
         """
-        x, y = position
-        source_board = self.board1 if target_board_number == 2 else self.board2
-        target_board = self.board2 if target_board_number == 2 else self.board1
+        make_move(self.board1, self.board2, move)
+        piece, captured, key = self.position.make_move(move)
+        self._invalidate_moves()
+        self.move_history.append(encode_record(move, piece, captured))
+        self.key_history.append(key)
+        self.current_player = 'black' if self.current_player == 'white' else 'white'
 
-        if target_board[x][y] is None:
-            piece = source_board[x][y]
-            source_board[x][y] = None
-            target_board[x][y] = piece
+    def _unapply_record(self):
+        """
+        Deshacer exactamente la última jugada del historial y devolver su
+        registro
+        """
+        record = self.move_history.pop()
+        key = self.key_history.pop()
+        move, piece, captured = decode_record(record)
+        x, y, (ex, ey), board_number = move
+        board = self.board1 if board_number == 1 else self.board2
+        transferred = board[ex][ey] is None
+        unmake_move(self.board1, self.board2, move,
+                    (decode_piece(piece), decode_piece(captured), transferred))
+        self.position.unmake_move(move, (piece, captured, key))
+        self._invalidate_moves()
+        self.current_player = 'black' if self.current_player == 'white' else 'white'
+        return record
 
     def _check_game_status(self):
         """
@@ -103,17 +255,32 @@ class Board:
         if not self.move_history:
             return False
         
-        last_move = self.move_history.pop()
-        
-        board = self.board1 if last_move['board_number'] == 1 else self.board2
-        
-        board[last_move['start'][0]][last_move['start'][1]] = last_move['piece']
-        board[last_move['end'][0]][last_move['end'][1]] = None
-        
-        self.current_player = 'black' if self.current_player == 'white' else 'white'
+        self._unapply_record()
+        del self.redo_history[:]
         
         return True
 
+    @property
+    def ply(self):
+        """
+        Número de jugadas hechas desde la posición inicial
+        """
+        return len(self.move_history)
+
+    def seek(self, ply):
+        """
+        Ir a cualquier jugada de la partida deshaciendo o rehaciendo
+        registros; las jugadas deshechas se conservan hasta el siguiente
+        move_piece
+        """
+        if not 0 <= ply <= len(self.move_history) + len(self.redo_history):
+            raise ValueError("Jugada fuera del historial")
+        while len(self.move_history) > ply:
+            self.redo_history.append(self._unapply_record())
+        while len(self.move_history) < ply:
+            self._apply_move(decode_record(self.redo_history.pop())[0])
+        return True
+
     def print_board(self, board_number):
         """
         Imprimir el estado de un tablero
@@ -0,0 +1,202 @@
+"""
+Text protocol front end for ChessAI, modelled on UCI, over stdin/stdout.
+
+    uci                                   -> id lines and uciok
+    isready                               -> readyok
+    ucinewgame                            clear the search tables
+    position startpos [moves 1e2e4 ...]
+    position fen <board 1> <board 2> <w|b> [moves ...]
+    go [depth N] [movetime MS] [wtime MS btime MS [winc MS binc MS]] [infinite]
+    stop                                  -> bestmove of the last completed depth
+    d                                     print the current position
+    quit
+
+Moves use position.format_move notation (source board, from, to: 1e2e4).
+A single ChessAI is kept for the whole session, so its transposition table
+and history heuristic carry over from one move to the next.
+"""
+import argparse
+import sys
+import threading
+import time
+
+from ai import ChessAI
+from board import Board
+from position import Position, format_move, parse_move
+
+ENGINE_NAME = "Alice Suicide Chess"
+
+# Share of the remaining clock spent on one move when no movetime is given
+MOVES_TO_GO = 30
+# Seconds between stop() attempts while the search thread is starting
+STOP_RETRY_INTERVAL = 0.01
+
+
+class Engine:
+    def __init__(self, output=None, tt_size_mb=16, weights=None):
+        self.output = output or sys.stdout
+        self.output_lock = threading.Lock()
+        self.board = Board()
+        self.ai = ChessAI(self.board, self.board.current_player, tt_size_mb=tt_size_mb, weights=weights)
+        self.ai.on_iteration = self.report_iteration
+        self.search_thread = None
+        self.search_start = None
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    def handle(self, line):
+        """
+        Run one command line; returns False after quit
+        """
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'ucinewgame':
+            self.wait()
+            self.ai.new_game()
+        elif command == 'position':
+            self.wait()
+            self.set_position(args)
+        elif command == 'go':
+            self.wait()
+            self.go(args)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'd':
+            self.send(self.board.position.to_text())
+        elif command == 'quit':
+            self.stop()
+            self.ai.close()
+            return False
+        else:
+            self.send(f"info string unknown command {command}")
+        return True
+
+    def set_position(self, args):
+        """
+        position startpos|fen <text> [moves ...]
+        """
+        moves = []
+        if 'moves' in args:
+            index = args.index('moves')
+            args, moves = args[:index], args[index + 1:]
+
+        board = Board()
+        if args[:1] == ['fen']:
+            try:
+                board.set_position(Position.from_text(' '.join(args[1:])))
+            except ValueError as e:
+                self.send(f"info string {e}")
+                return
+        elif args[:1] != ['startpos']:
+            self.send("info string expected startpos or fen")
+            return
+
+        for text in moves:
+            try:
+                x, y, end, board_number = parse_move(text)
+                board.move_piece((x, y), end, board_number)
+            except ValueError:
+                self.send(f"info string illegal move {text}")
+                break
+
+        self.board = board
+        self.ai.board_instance = board
+
+    def search_budget(self, options):
+        """
+        (depth, seconds) for the go options; seconds is None to search until
+        the depth is reached or stop arrives
+        """
+        depth = options.get('depth')
+        if 'movetime' in options:
+            return depth, options['movetime'] / 1000
+        side = 'w' if self.board.current_player == 'white' else 'b'
+        if f'{side}time' in options:
+            budget = options[f'{side}time'] / MOVES_TO_GO + options.get(f'{side}inc', 0)
+            return depth, min(budget, options[f'{side}time'] / 2) / 1000
+        if depth is None and 'infinite' not in options:
+            return 3, None
+        return depth, None
+
+    def go(self, args):
+        options = {}
+        index = 0
+        while index < len(args):
+            name = args[index]
+            if name == 'infinite':
+                options[name] = True
+                index += 1
+                continue
+            try:
+                options[name] = int(args[index + 1])
+            except (IndexError, ValueError):
+                self.send(f"info string bad value for {name}")
+                return
+            if name in ('depth', 'movetime') and options[name] < 1:
+                self.send(f"info string {name} must be positive")
+                return
+            index += 2
+
+        depth, seconds = self.search_budget(options)
+        self.ai.color = self.board.current_player
+        self.search_start = time.perf_counter()
+        self.search_thread = threading.Thread(
+            target=self.search, args=(depth, float('inf') if seconds is None else seconds), daemon=True
+        )
+        self.search_thread.start()
+
+    def search(self, depth, seconds):
+        best_move = self.ai.choose_best_move(depth=depth, time_limit=seconds)
+        self.send(f"bestmove {format_move(best_move) if best_move else '(none)'}")
+
+    def report_iteration(self, depth, best_move, value):
+        elapsed = time.perf_counter() - self.search_start
+        nps = int(self.ai.nodes / elapsed) if elapsed else 0
+        self.send(f"info depth {depth} score cp {value} nodes {self.ai.nodes} "
+                  f"nps {nps} time {int(elapsed * 1000)} pv {format_move(best_move)}")
+
+    def stop(self):
+        """
+        End the running search, if any, and wait for its bestmove
+        """
+        if self.search_thread is not None:
+            # stop() is ignored until the thread has started searching
+            while not self.ai.stop() and self.search_thread.is_alive():
+                self.search_thread.join(STOP_RETRY_INTERVAL)
+            self.wait()
+
+    def wait(self):
+        if self.search_thread is not None:
+            self.search_thread.join()
+            self.search_thread = None
+
+    def run(self, lines=None):
+        for line in lines or sys.stdin:
+            if not self.handle(line):
+                break
+        else:
+            self.stop()
+            self.ai.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text protocol engine for Alice suicide chess")
+    parser.add_argument('--hash', type=int, default=16, help="transposition table size in MB")
+    parser.add_argument('--weights', help="evaluation weights file written by tune.py")
+    args = parser.parse_args()
+    Engine(tt_size_mb=args.hash, weights=args.weights).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+from position import PIECE_NAMES, TYPE_MASK, BLACK, SIDE_TO_MOVE
+
+WHITE_SIDE = 0
+BLACK_SIDE = 1
+
+# Default weights of ChessAI, also the starting point of tune.py
+DEFAULT_PIECE_VALUES = {
+    'Pawn': 10,
+    'Knight': 30,
+    'Bishop': 30,
+    'Rook': 50,
+    'Queen': 90,
+    'King': 900
+}
+DEFAULT_PIECE_COUNT_BONUS = 50
+
+
+class Evaluation:
+    """
+    Evaluation terms of a Position kept up to date while the search makes
+    and unmakes moves, so scoring a leaf does not rescan both boards.
+
+    Per side it tracks material (from piece_values), number of pieces (for
+    the suicide bonus) and piece-square sums. piece_square_tables maps a
+    piece name to 128 values (board 1 then board 2, white's point of view;
+    black pieces use the mirrored row).
+    """
+
+    def __init__(self, piece_values, piece_count_bonus=DEFAULT_PIECE_COUNT_BONUS, piece_square_tables=None):
+        self.piece_values = piece_values
+        self.piece_count_bonus = piece_count_bonus
+        self.piece_square_tables = piece_square_tables or {}
+        self.material = [0, 0]
+        self.counts = [0, 0]
+        self.piece_square = [0, 0]
+        self.values = [0] * 16
+        self.square_values = [0] * (SIDE_TO_MOVE * 16)
+
+    def build_tables(self):
+        """
+        Expand piece_values and piece_square_tables into flat lookup tables
+        indexed by byte code (type and color bits)
+        """
+        for code in range(16):
+            piece_type = code & TYPE_MASK
+            if piece_type == 0 or piece_type >= len(PIECE_NAMES):
+                continue
+            name = PIECE_NAMES[piece_type]
+            self.values[code] = self.piece_values[name]
+            table = self.piece_square_tables.get(name)
+            for index in range(SIDE_TO_MOVE):
+                if table is None:
+                    value = 0
+                elif code & BLACK:
+                    board, square = divmod(index, 64)
+                    x, y = divmod(square, 8)
+                    value = table[board * 64 + (7 - x) * 8 + y]
+                else:
+                    value = table[index]
+                self.square_values[index * 16 + code] = value
+
+    def reset(self, position):
+        """
+        Recompute every term from scratch for a position
+        """
+        self.build_tables()
+        self.material = [0, 0]
+        self.counts = [0, 0]
+        self.piece_square = [0, 0]
+        squares = position.squares
+        for index in range(SIDE_TO_MOVE):
+            code = squares[index]
+            if code:
+                side = BLACK_SIDE if code & BLACK else WHITE_SIDE
+                self.material[side] += self.values[code & 15]
+                self.counts[side] += 1
+                self.piece_square[side] += self.square_values[index * 16 + (code & 15)]
+
+    def update(self, position, move, undo, sign):
+        """
+        Account for a move just made (sign=1) or about to be unmade
+        (sign=-1); position must be in its after-move state
+        """
+        x, y, end, board_number = move
+        piece, captured = undo[0], undo[1]
+        base = 0 if board_number == 1 else 64
+        offset = end[0] * 8 + end[1]
+        target = base + offset
+        final = target if position.squares[target] else (64 - base) + offset
+        code = piece & 15
+        side = BLACK_SIDE if piece & BLACK else WHITE_SIDE
+        square_values = self.square_values
+
+        self.piece_square[side] += sign * (square_values[final * 16 + code]
+                                           - square_values[(base + x * 8 + y) * 16 + code])
+        if captured:
+            captured_code = captured & 15
+            other = 1 - side
+            self.material[other] -= sign * self.values[captured_code]
+            self.counts[other] -= sign
+            self.piece_square[other] -= sign * square_values[target * 16 + captured_code]
+
+    def capture_gain(self, position, move):
+        """
+        Change of score, from the mover's point of view, made by a capture
+        not yet played: material and piece-square value of the victim, the
+        lost piece count bonus and the mover's piece-square change
+        """
+        x, y, end, board_number = move
+        base = 0 if board_number == 1 else 64
+        offset = end[0] * 8 + end[1]
+        target = base + offset
+        start = base + x * 8 + y
+        squares = position.squares
+        code = squares[start] & 15
+        captured_code = squares[target] & 15
+        square_values = self.square_values
+        # A capturing piece always transfers to the other board
+        return (self.values[captured_code] - self.piece_count_bonus
+                + square_values[target * 16 + captured_code]
+                + square_values[((64 - base) + offset) * 16 + code]
+                - square_values[start * 16 + code])
+
+    def score(self, color):
+        """
+        Score from color's point of view, same terms as ChessAI.evaluate_board
+        """
+        own = BLACK_SIDE if color == 'black' else WHITE_SIDE
+        other = 1 - own
+        return (self.material[own] - self.material[other]
+                + (self.counts[other] - self.counts[own]) * self.piece_count_bonus
+                + self.piece_square[own] - self.piece_square[other])
@@ -0,0 +1,290 @@
+"""
+Game records of Alice suicide chess in a compact binary format and a
+PGN-like text format, with streaming readers and writers.
+
+Binary file: the magic b'ALGR' and a version byte, then per game a varint
+length and UTF-8 JSON object of tags, a varint ply count and two bytes per
+ply (little endian): origin square (6 bits), destination square (6 bits),
+board (1 bit) and a capture flag (1 bit), the same layout as the low bits of
+a Board.move_history record. The transfer to the other board is implied by
+the rules (a move's destination must be empty on the other board), so it
+needs no bit of its own.
+
+Text file, one game per block:
+
+    [White "engine1"]
+    [Black "engine2"]
+    [Result "1-0"]
+    [Position "<Position.to_text>"]      only when not the initial position
+
+    1. 1e2e4 1d7d5 2. 2e4xd5 ... 1-0
+
+Readers are generators yielding one GameRecord at a time, so archives of
+any size are processed in constant memory.
+"""
+import json
+import struct
+
+from board import RECORD_END_SHIFT, RECORD_BOARD_SHIFT, RECORD_SQUARE_MASK
+from position import Position, format_move, parse_move
+
+MAGIC = b'ALGR'
+VERSION = 1
+PLY_CAPTURE = 1 << 13
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+TEXT_LINE_LENGTH = 79
+
+
+class GameRecord:
+    """
+    One game: tags (White, Black, Result, ...), the start position (None
+    for the initial one) and the moves as (x, y, (fx, fy), board) tuples.
+    captures holds one flag per move; it is filled by replaying the game
+    when not given.
+    """
+
+    def __init__(self, moves, tags=None, start=None, captures=None):
+        self.moves = list(moves)
+        self.tags = dict(tags or {})
+        self.start = start
+        self.captures = list(captures) if captures is not None else None
+
+    @property
+    def result(self):
+        return self.tags.get('Result', '*')
+
+    def start_position(self):
+        return Position.from_text(self.start) if self.start else Position.initial()
+
+    def positions(self):
+        """
+        Yield (position, move) for every ply, the position being the one
+        before the move; the same Position object is updated in place
+        """
+        position = self.start_position()
+        for move in self.moves:
+            yield position, move
+            position.make_move(move)
+
+    def capture_flags(self):
+        if self.captures is None:
+            self.captures = [
+                bool(position.squares[(0 if move[3] == 1 else 64) + move[2][0] * 8 + move[2][1]])
+                for position, move in self.positions()
+            ]
+        return self.captures
+
+    def __eq__(self, other):
+        return (isinstance(other, GameRecord) and self.moves == other.moves
+                and self.tags == other.tags and self.start == other.start)
+
+    def __repr__(self):
+        return f"GameRecord({len(self.moves)} plies, {self.tags})"
+
+
+def encode_ply(move, capture):
+    x, y, end, board_number = move
+    return (x * 8 + y
+            | (end[0] * 8 + end[1]) << RECORD_END_SHIFT
+            | (board_number - 1) << RECORD_BOARD_SHIFT
+            | (PLY_CAPTURE if capture else 0))
+
+
+def decode_ply(ply):
+    """
+    (move, capture) of a two-byte ply
+    """
+    start = ply & RECORD_SQUARE_MASK
+    end = (ply >> RECORD_END_SHIFT) & RECORD_SQUARE_MASK
+    move = (start >> 3, start & 7, (end >> 3, end & 7), ((ply >> RECORD_BOARD_SHIFT) & 1) + 1)
+    return move, bool(ply & PLY_CAPTURE)
+
+
+def _write_varint(file, value):
+    data = bytearray()
+    while value >= 0x80:
+        data.append(value & 0x7f | 0x80)
+        value >>= 7
+    data.append(value)
+    file.write(data)
+
+
+def _read_varint(file):
+    """
+    Next varint of file, or None at end of file
+    """
+    value = shift = 0
+    while True:
+        byte = file.read(1)
+        if not byte:
+            if shift:
+                raise ValueError("Truncated game record")
+            return None
+        value |= (byte[0] & 0x7f) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+class BinaryGameWriter:
+    """
+    Append games to a binary file object opened in 'wb' mode
+    """
+
+    def __init__(self, file):
+        self.file = file
+        file.write(MAGIC + bytes([VERSION]))
+
+    def write(self, game):
+        tags = dict(game.tags)
+        if game.start:
+            tags['Position'] = game.start
+        meta = json.dumps(tags, separators=(',', ':')).encode()
+        _write_varint(self.file, len(meta))
+        self.file.write(meta)
+        _write_varint(self.file, len(game.moves))
+        plies = [encode_ply(move, capture) for move, capture in zip(game.moves, game.capture_flags())]
+        self.file.write(struct.pack(f'<{len(plies)}H', *plies))
+
+
+def read_binary_games(file):
+    """
+    Yield the GameRecords of a binary file object opened in 'rb' mode
+    """
+    header = file.read(len(MAGIC) + 1)
+    if header[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a game record file")
+    if header[len(MAGIC)] != VERSION:
+        raise ValueError(f"Unsupported game record version {header[len(MAGIC)]}")
+
+    while True:
+        length = _read_varint(file)
+        if length is None:
+            return
+        tags = json.loads(file.read(length).decode())
+        count = _read_varint(file)
+        if count is None:
+            raise ValueError("Truncated game record")
+        data = file.read(2 * count)
+        if len(data) != 2 * count:
+            raise ValueError("Truncated game record")
+        moves = []
+        captures = []
+        for ply in struct.unpack(f'<{count}H', data):
+            move, capture = decode_ply(ply)
+            moves.append(move)
+            captures.append(capture)
+        start = tags.pop('Position', None)
+        yield GameRecord(moves, tags, start, captures)
+
+
+def format_ply(move, capture):
+    """
+    Text form of a ply: format_move with an 'x' before a captured square
+    """
+    text = format_move(move)
+    return f"{text[:3]}x{text[3:]}" if capture else text
+
+
+def parse_ply(text):
+    """
+    (move, capture) of a format_ply token
+    """
+    capture = len(text) == 6 and text[3] == 'x'
+    return parse_move(text[:3] + text[4:] if capture else text), capture
+
+
+class TextGameWriter:
+    """
+    Append games in the PGN-like text format to a text file object
+    """
+
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, game):
+        tags = dict(game.tags)
+        tags.setdefault('Result', '*')
+        if game.start:
+            tags['Position'] = game.start
+        for name, value in tags.items():
+            escaped = str(value).replace('\\', '\\\\').replace('"', '\\"')
+            self.file.write(f'[{name} "{escaped}"]\n')
+        self.file.write('\n')
+
+        tokens = []
+        for index, (move, capture) in enumerate(zip(game.moves, game.capture_flags())):
+            if index % 2 == 0:
+                tokens.append(f"{index // 2 + 1}.")
+            tokens.append(format_ply(move, capture))
+        tokens.append(tags['Result'])
+
+        line = ''
+        for token in tokens:
+            if line and len(line) + 1 + len(token) > TEXT_LINE_LENGTH:
+                self.file.write(line + '\n')
+                line = token
+            else:
+                line = f"{line} {token}" if line else token
+        self.file.write(line + '\n\n')
+
+
+def _parse_tag(line):
+    name, _, value = line[1:-1].partition(' ')
+    value = value.strip()
+    if len(value) < 2 or value[0] != '"' or value[-1] != '"':
+        raise ValueError(f"Invalid tag: {line}")
+    return name, value[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+
+
+def read_text_games(file):
+    """
+    Yield the GameRecords of a text file object, one game block at a time
+    """
+    tags = {}
+    moves = []
+    captures = []
+    for line in file:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('['):
+            name, value = _parse_tag(line)
+            tags[name] = value
+            continue
+        for token in line.split():
+            if token in RESULTS:
+                start = tags.pop('Position', None)
+                yield GameRecord(moves, tags, start, captures)
+                tags, moves, captures = {}, [], []
+            elif not token.endswith('.'):
+                move, capture = parse_ply(token)
+                moves.append(move)
+                captures.append(capture)
+    if moves or tags:
+        raise ValueError("Game without result at end of file")
+
+
+def open_writer(path):
+    """
+    (file, writer) for path: text format for a .pgn suffix, binary otherwise
+    """
+    if path.endswith('.pgn'):
+        file = open(path, 'w')
+        return file, TextGameWriter(file)
+    file = open(path, 'wb')
+    return file, BinaryGameWriter(file)
+
+
+def read_games(path):
+    """
+    Yield the GameRecords of a file in either format
+    """
+    with open(path, 'rb') as file:
+        binary = file.read(len(MAGIC)) == MAGIC
+    if binary:
+        with open(path, 'rb') as file:
+            yield from read_binary_games(file)
+    else:
+        with open(path) as file:
+            yield from read_text_games(file)
@@ -1,6 +1,14 @@
 import tkinter as tk
 from tkinter import messagebox
 import os
+import queue
+import threading
+import time
+
+from position import decode_piece, format_move
+
+# Intervalo (ms) con el que la interfaz revisa el progreso de la IA
+AI_POLL_INTERVAL = 100
 
 class ChessGUI:
     def __init__(self, board):
@@ -13,6 +21,24 @@ class ChessGUI:
         
         self.square_size = 70
         self.board_padding = 20
+
+        self.ai_time_limit = 2.0
+        # Una sola IA para toda la partida, que conserva sus tablas entre jugadas
+        self.ai = None
+        # Búsqueda en segundo plano: hilo, resultados y último progreso
+        self.ai_thread = None
+        self.ai_results = queue.Queue()
+        self.ai_progress = {}
+        self.ai_cancelled = False
+        self.ai_start = None
+        
+        # Elementos persistentes del lienzo por casilla y capa de resaltados,
+        # y códigos de pieza dibujados (como Position.squares) para redibujar
+        # solo las casillas que cambian
+        self.square_items = [[], []]
+        self.highlight_items = [None, None]
+        self.shown_highlights = []
+        self.drawn_squares = None
         
         self.create_board_frames()
         
@@ -47,10 +73,13 @@ class ChessGUI:
                 'canvas': canvas
             })
 
+        self.update_boards()
+
     def draw_board(self, canvas, board_num):
-        """Dibujar tablero de ajedrez"""
+        """Dibujar tablero de ajedrez: casillas, piezas y capa de resaltados"""
         canvas.delete("all")
         board = self.board.board1 if board_num == 1 else self.board.board2
+        items = []
         
         for row in range(8):
             for col in range(8):
@@ -63,14 +92,47 @@ class ChessGUI:
                 canvas.create_rectangle(x1, y1, x2, y2, fill=color)
                 
                 piece = board[row][col]
-                if piece:
-                    piece_text = self.get_piece_initials(piece)
-                    canvas.create_text(
-                        x1 + self.square_size // 2, 
-                        y1 + self.square_size // 2, 
-                        text=piece_text, 
-                        font=("Arial", 24)
-                    )
+                items.append(canvas.create_text(
+                    x1 + self.square_size // 2, 
+                    y1 + self.square_size // 2, 
+                    text=self.get_piece_initials(piece) if piece else "", 
+                    font=("Arial", 24)
+                ))
+
+        # Resaltados creados una vez, encima de las piezas, y solo movidos
+        # u ocultados después
+        selection = canvas.create_rectangle(0, 0, 0, 0, outline='red', width=3, state=tk.HIDDEN)
+        destinations = [
+            canvas.create_rectangle(0, 0, 0, 0, outline='green', width=3, state=tk.HIDDEN)
+            for _ in range(64)
+        ]
+        self.square_items[board_num - 1] = items
+        self.highlight_items[board_num - 1] = (selection, destinations)
+        self.shown_highlights = [
+            (shown_canvas, item) for shown_canvas, item in self.shown_highlights if shown_canvas is not canvas
+        ]
+        self.drawn_squares = None
+
+    def show_highlights(self, board_num, square, destinations):
+        """Mostrar la pieza seleccionada y sus destinos legales"""
+        self.clear_highlights()
+        canvas = self.board_frames[board_num-1]['canvas']
+        selection, destination_items = self.highlight_items[board_num - 1]
+        size = self.square_size
+        row, col = square
+        canvas.coords(selection, col * size, row * size, (col + 1) * size, (row + 1) * size)
+        canvas.itemconfigure(selection, state=tk.NORMAL)
+        self.shown_highlights.append((canvas, selection))
+        for item, (dest_row, dest_col) in zip(destination_items, destinations):
+            canvas.coords(item, dest_col * size, dest_row * size, (dest_col + 1) * size, (dest_row + 1) * size)
+            canvas.itemconfigure(item, state=tk.NORMAL)
+            self.shown_highlights.append((canvas, item))
+
+    def clear_highlights(self):
+        """Ocultar los resaltados visibles"""
+        for canvas, item in self.shown_highlights:
+            canvas.itemconfigure(item, state=tk.HIDDEN)
+        self.shown_highlights = []
 
     def get_piece_initials(self, piece):
         """Obtener iniciales de la pieza con el color"""
@@ -85,15 +147,28 @@ class ChessGUI:
         
 
 
-        ai_btn = tk.Button(
+        self.ai_button = tk.Button(
             button_frame, 
             text="Mover IA", 
             command=self.make_ai_move
         )
-        ai_btn.pack(side=tk.LEFT, padx=5)
+        self.ai_button.pack(side=tk.LEFT, padx=5)
+
+        self.cancel_button = tk.Button(
+            button_frame,
+            text="Cancelar",
+            command=self.cancel_ai_move,
+            state=tk.DISABLED
+        )
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+
+        self.progress_label = tk.Label(button_frame, text="", width=48, anchor=tk.W)
+        self.progress_label.pack(side=tk.LEFT, padx=5)
 
     def on_square_click(self, event, board_num):
         """Manejar clics en el tablero"""
+        if self.ai_thread is not None:
+            return
         col = event.x // self.square_size
         row = event.y // self.square_size
         
@@ -104,15 +179,8 @@ class ChessGUI:
             if piece and piece.color == self.board.current_player:
                 self.selected_piece = (row, col)
                 self.selected_board = board_num
-                canvas = self.board_frames[board_num-1]['canvas']
-                x1 = col * self.square_size
-                y1 = row * self.square_size
-                canvas.create_rectangle(
-                    x1, y1, 
-                    x1 + self.square_size, 
-                    y1 + self.square_size, 
-                    outline='red', 
-                    width=3
+                self.show_highlights(
+                    board_num, (row, col), self.board.legal_destinations((row, col), board_num)
                 )
         else:
             try:
@@ -129,8 +197,6 @@ class ChessGUI:
                         self.selected_board
                     )
                 
-                self.update_boards()
-                
                 self.selected_piece = None
                 self.selected_board = None
             except ValueError as e:
@@ -138,39 +204,114 @@ class ChessGUI:
                 self.selected_piece = None
                 self.selected_board = None
                 
+            self.clear_highlights()
             self.update_boards()
 
     def update_boards(self):
-        """Actualizar visualización de ambos tableros"""
-        for i, board_data in enumerate(self.board_frames):
-            self.draw_board(board_data['canvas'], i+1)
+        """Actualizar solo las casillas que cambiaron desde el último dibujo"""
+        squares = self.board.position.squares
+        drawn = self.drawn_squares
+        for index in range(128):
+            code = squares[index] & 15
+            if drawn is not None and drawn[index] == code:
+                continue
+            board_num, square = divmod(index, 64)
+            piece = decode_piece(code)
+            self.board_frames[board_num]['canvas'].itemconfigure(
+                self.square_items[board_num][square],
+                text=self.get_piece_initials(piece) if piece else ""
+            )
+        self.drawn_squares = bytes(code & 15 for code in squares[:128])
 
 
     def make_ai_move(self):
-        """Realizar movimiento de IA"""
-        from ai import ChessAI
-        
-        ai = ChessAI(self.board, self.board.current_player)
-        
-        best_move = ai.choose_best_move()
-        
-        if best_move:
+        """Iniciar la búsqueda de la IA en un hilo, sobre una copia del tablero"""
+        if self.ai_thread is not None:
+            return
+        snapshot = self.board.copy()
+        if self.ai is None:
+            from ai import ChessAI
+            self.ai = ChessAI(snapshot, snapshot.current_player)
+            self.ai.on_iteration = self.on_ai_iteration
+        self.ai.board_instance = snapshot
+        self.ai.color = snapshot.current_player
+
+        self.ai_progress = {}
+        self.ai_cancelled = False
+        self.ai_start = time.perf_counter()
+        self.ai_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_label.config(text="Pensando...")
+
+        self.ai_thread = threading.Thread(
+            target=self.search_ai_move, args=(snapshot.position.key,), daemon=True
+        )
+        self.ai_thread.start()
+        self.window.after(AI_POLL_INTERVAL, self.poll_ai_move)
+
+    def search_ai_move(self, key):
+        """Cuerpo del hilo de la IA; nunca toca los widgets"""
+        try:
+            best_move = self.ai.choose_best_move(time_limit=self.ai_time_limit)
+            self.ai_results.put((key, best_move, None))
+        except Exception as e:
+            self.ai_results.put((key, None, e))
+
+    def on_ai_iteration(self, depth, best_move, value):
+        """Llamado desde el hilo de la IA al completar cada profundidad"""
+        self.ai_progress = {'depth': depth, 'best_move': best_move, 'value': value}
+
+    def cancel_ai_move(self):
+        """Detener la búsqueda en curso sin jugar su movimiento"""
+        if self.ai_thread is not None:
+            self.ai_cancelled = True
+            self.ai.stop()
+            self.progress_label.config(text="Cancelando...")
+
+    def poll_ai_move(self):
+        """Mostrar el progreso de la IA y aplicar su movimiento al terminar"""
+        try:
+            key, best_move, error = self.ai_results.get_nowait()
+        except queue.Empty:
+            if self.ai_cancelled:
+                # stop() no hace nada si la búsqueda aún no había empezado
+                self.ai.stop()
+            self.show_ai_progress()
+            self.window.after(AI_POLL_INTERVAL, self.poll_ai_move)
+            return
+
+        self.ai_thread = None
+        self.ai_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        self.show_ai_progress()
+
+        if self.ai_cancelled:
+            self.progress_label.config(text="Búsqueda cancelada")
+        elif error is not None:
+            messagebox.showerror("Error de IA", str(error))
+        elif key != self.board.position.key:
+            self.progress_label.config(text="El tablero cambió durante la búsqueda")
+        elif best_move:
             try:
                 start = (best_move[0], best_move[1])
                 end = (best_move[2][0], best_move[2][1])
-                board_num = best_move[3]  
-                
-                if board_num == 1:
-                    self.board.move_piece(start, end, board_num)
-                else:
-                    self.board.move_piece(start, end, 2)
-                
+                self.board.move_piece(start, end, best_move[3])
                 self.update_boards()
             except Exception as e:
                 messagebox.showerror("Error de IA", str(e))
         else:
             messagebox.showinfo("IA", "No hay movimientos posibles")
 
+    def show_ai_progress(self):
+        """Profundidad, nodos por segundo y mejor movimiento actual"""
+        progress = self.ai_progress
+        elapsed = time.perf_counter() - self.ai_start
+        nps = self.ai.nodes / elapsed if elapsed else 0
+        text = f"Profundidad {progress.get('depth', 0)}  {nps:,.0f} nodos/s"
+        if progress.get('best_move'):
+            text += f"  Mejor: {format_move(progress['best_move'])} ({progress['value']})"
+        self.progress_label.config(text=text)
+
     def run(self):
         """Iniciar bucle principal de la interfaz"""
         self.window.mainloop()
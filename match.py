@@ -0,0 +1,284 @@
+"""
+Headless ChessAI vs ChessAI matches of Alice suicide chess over a process pool.
+
+    python match.py --games 200 --engine depth=2 --engine depth=3
+    python match.py --games 100 --engine name=fast,movetime=50 --engine name=q0,depth=2,quiescence=0
+
+Each engine spec is a comma separated list of key=value pairs: name, depth,
+movetime (ms per move), quiescence (0/1), hash (transposition table MB) and
+weights (evaluation weights file written by tune.py).
+Games start from a random opening of --opening-plies moves and are played
+in pairs with colors swapped on the same opening. Games are adjudicated as
+draws after --max-plies plies, a threefold repetition or --no-capture-plies
+plies without a capture. One JSON line per game goes to --output as games
+finish, and a summary from the first engine's point of view is printed.
+"""
+import argparse
+import json
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ai import ChessAI
+from board import Board
+from gamerecord import GameRecord, open_writer
+from position import format_move, parse_move
+
+DEFAULT_ENGINE = {'name': None, 'depth': 2, 'movetime': None, 'quiescence': 1, 'hash': 16, 'weights': None}
+
+# Per-process engines, keyed by color and spec
+_worker_engines = {}
+
+
+def parse_engine(text, index):
+    """
+    Engine spec dict from 'key=value,...'
+    """
+    spec = dict(DEFAULT_ENGINE)
+    for item in filter(None, text.split(',')):
+        key, _, value = item.partition('=')
+        if key not in spec:
+            raise ValueError(f"Unknown engine option: {key}")
+        spec[key] = value if key in ('name', 'weights') else int(value)
+    if spec['name'] is None:
+        spec['name'] = f"engine{index + 1}"
+    return spec
+
+
+def get_engine(spec, color):
+    key = (color,) + tuple(sorted(spec.items()))
+    if key not in _worker_engines:
+        _worker_engines[key] = ChessAI(None, 'white', tt_size_mb=spec['hash'],
+                                       use_quiescence=bool(spec['quiescence']), weights=spec['weights'])
+    return _worker_engines[key]
+
+
+def random_opening(board, plies, rng):
+    """
+    Play up to plies random legal moves; returns them
+    """
+    moves = []
+    for _ in range(plies):
+        legal_moves = board.legal_moves()
+        if not legal_moves:
+            break
+        move = rng.choice(legal_moves)
+        board.move_piece((move[0], move[1]), move[2], move[3])
+        moves.append(move)
+    return moves
+
+
+def play_game(job):
+    """
+    Worker entry point: play one game and return its result dict
+    """
+    start = time.perf_counter()
+    rng = random.Random(job['seed'])
+    board = Board()
+    opening = random_opening(board, job['opening_plies'], random.Random(job['opening_seed']))
+
+    engines = {}
+    for color in ('white', 'black'):
+        spec = job[color]
+        ai = get_engine(spec, color)
+        ai.new_game()
+        ai.random.seed(rng.getrandbits(32))
+        ai.board_instance = board
+        ai.color = color
+        engines[color] = (ai, spec)
+
+    moves = []
+    key_counts = {}
+    last_capture = len(opening)
+    result = reason = None
+    while result is None:
+        # Same rule as AliceSuicideChess.check_game_over: the side left
+        # without moves loses
+        if not board.has_legal_move():
+            result = '0-1' if board.current_player == 'white' else '1-0'
+            reason = 'no moves'
+            break
+        ply = len(opening) + len(moves)
+        key_counts[board.position.key] = key_counts.get(board.position.key, 0) + 1
+        if key_counts[board.position.key] >= 3:
+            result, reason = '1/2-1/2', 'repetition'
+        elif ply >= job['max_plies']:
+            result, reason = '1/2-1/2', 'max plies'
+        elif ply - last_capture >= job['no_capture_plies']:
+            result, reason = '1/2-1/2', 'no captures'
+        else:
+            ai, spec = engines[board.current_player]
+            movetime = spec['movetime']
+            move = ai.choose_best_move(depth=spec['depth'] if movetime is None else None,
+                                       time_limit=movetime / 1000 if movetime is not None else None)
+            if board.has_forced_capture():
+                last_capture = ply + 1
+            board.move_piece((move[0], move[1]), move[2], move[3])
+            moves.append(move)
+
+    return {
+        'game': job['game'],
+        'white': job['white']['name'],
+        'black': job['black']['name'],
+        'result': result,
+        'reason': reason,
+        'plies': len(opening) + len(moves),
+        'opening': [format_move(move) for move in opening],
+        'moves': [format_move(move) for move in moves],
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def game_record(record):
+    """
+    GameRecord (see gamerecord.py) of a play_game result, opening included
+    """
+    return GameRecord(
+        [parse_move(text) for text in record['opening'] + record['moves']],
+        {
+            'Game': record['game'],
+            'White': record['white'],
+            'Black': record['black'],
+            'Result': record['result'],
+            'Termination': record['reason'],
+            'OpeningPlies': len(record['opening']),
+        }
+    )
+
+
+def make_jobs(engines, games, seed, opening_plies, max_plies, no_capture_plies):
+    """
+    Game descriptions, two per opening with colors swapped
+    """
+    rng = random.Random(seed)
+    jobs = []
+    for game in range(games):
+        if game % 2 == 0:
+            opening_seed = rng.getrandbits(32)
+        white, black = (engines[0], engines[1]) if game % 2 == 0 else (engines[1], engines[0])
+        jobs.append({
+            'game': game,
+            'white': white,
+            'black': black,
+            'seed': rng.getrandbits(32),
+            'opening_seed': opening_seed,
+            'opening_plies': opening_plies,
+            'max_plies': max_plies,
+            'no_capture_plies': no_capture_plies,
+        })
+    return jobs
+
+
+def game_score(record, name):
+    """
+    Points scored by the engine called name in one game
+    """
+    if record['result'] == '1/2-1/2':
+        return 0.5
+    winner = record['white'] if record['result'] == '1-0' else record['black']
+    return 1.0 if winner == name else 0.0
+
+
+def summarize(records, name, elapsed):
+    """
+    Wins, draws, losses, score with a 95% interval and Elo difference of
+    engine name against its opponent
+    """
+    scores = [game_score(record, name) for record in records]
+    games = len(scores)
+    wins = scores.count(1.0)
+    draws = scores.count(0.5)
+    mean = sum(scores) / games if games else 0.0
+    variance = sum((score - mean) ** 2 for score in scores) / (games - 1) if games > 1 else 0.0
+    margin = 1.96 * math.sqrt(variance / games) if games else 0.0
+    return {
+        'games': games,
+        'wins': wins,
+        'draws': draws,
+        'losses': games - wins - draws,
+        'score': mean,
+        'score_low': max(0.0, mean - margin),
+        'score_high': min(1.0, mean + margin),
+        'elo': elo(mean),
+        'elo_low': elo(max(0.0, mean - margin)),
+        'elo_high': elo(min(1.0, mean + margin)),
+        'games_per_second': games / elapsed if elapsed else 0.0,
+    }
+
+
+def elo(score):
+    if score <= 0.0:
+        return float('-inf')
+    if score >= 1.0:
+        return float('inf')
+    return -400 * math.log10(1 / score - 1)
+
+
+def run_match(engines, games, workers=None, seed=0, output=None, opening_plies=4,
+              max_plies=200, no_capture_plies=60, on_game=None):
+    """
+    Play the match and return the list of game records (in finishing
+    order); on_game(record) is called as each game finishes
+    """
+    jobs = make_jobs(engines, games, seed, opening_plies, max_plies, no_capture_plies)
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(play_game, job) for job in jobs]
+        for future in as_completed(futures):
+            record = future.result()
+            records.append(record)
+            if output is not None:
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+            if on_game is not None:
+                on_game(record)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChessAI self-play matches")
+    parser.add_argument('--engine', action='append', default=[])
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--opening-plies', type=int, default=4)
+    parser.add_argument('--max-plies', type=int, default=200)
+    parser.add_argument('--no-capture-plies', type=int, default=60)
+    parser.add_argument('--output', default='match.jsonl')
+    parser.add_argument('--record', help="also save the games, as text if the name ends in .pgn, "
+                                         "otherwise in the binary format of gamerecord.py")
+    args = parser.parse_args()
+
+    specs = args.engine + ['depth=2'] * (2 - len(args.engine))
+    if len(specs) != 2:
+        parser.error("give at most two --engine specs")
+    engines = [parse_engine(text, index) for index, text in enumerate(specs)]
+    if engines[0]['name'] == engines[1]['name']:
+        engines[1]['name'] += "'"
+
+    record_file = on_game = None
+    if args.record:
+        record_file, writer = open_writer(args.record)
+        on_game = lambda record: writer.write(game_record(record))
+
+    start = time.perf_counter()
+    try:
+        with open(args.output, 'w') as output:
+            records = run_match(engines, args.games, args.workers, args.seed, output,
+                                args.opening_plies, args.max_plies, args.no_capture_plies, on_game)
+    finally:
+        if record_file is not None:
+            record_file.close()
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(records, engines[0]['name'], elapsed)
+    print(f"{engines[0]['name']} vs {engines[1]['name']}: "
+          f"+{summary['wins']} ={summary['draws']} -{summary['losses']} in {summary['games']} games")
+    print(f"score {summary['score']:.3f} [{summary['score_low']:.3f}, {summary['score_high']:.3f}] "
+          f"elo {summary['elo']:+.0f} [{summary['elo_low']:+.0f}, {summary['elo_high']:+.0f}] (95%)")
+    print(f"{summary['games_per_second']:.2f} games/s, results in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
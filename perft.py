@@ -0,0 +1,186 @@
+"""
+Perft node counts and move generator benchmarks for Alice suicide chess.
+
+    python perft.py                   check the reference counts with every generator
+    python perft.py --divide 0 3      per-move counts of position 0 at depth 3
+    python perft.py --bench           nodes per second of every generator
+"""
+import argparse
+import time
+
+import bitboards
+from board import Board
+from position import Position, format_move
+
+# (name, position, {depth: leaf nodes}) with moves following the
+# captures-are-forced rule of ChessAI.get_all_possible_moves
+POSITIONS = [
+    ('start', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR 8/8/8/8/8/8/8/8 w',
+     {1: 20, 2: 400, 3: 6045, 4: 89885, 5: 1432092}),
+    ('rooks on board 2', '1nbqkbn1/1pppppp1/8/8/8/8/1PPPPPP1/RNBQKBN1 8/8/8/p6r/7P/8/r7/8 w',
+     {1: 21, 2: 25, 3: 334, 4: 7190, 5: 95519}),
+    ('queen out', 'rnbqk1nr/pp1p1p1p/8/5Q2/8/8/PPP2PPP/RNB1KBNR 8/8/8/2b1p3/8/4P3/8/8 w',
+     {1: 3, 2: 4, 3: 7, 4: 115, 5: 2431}),
+    ('forced captures', '2bqkb1r/7p/2Q5/5n2/8/8/4PP1P/2B1KB1R 8/8/5p2/4p1p1/2P5/3P2PN/8/8 w',
+     {1: 3, 2: 70, 3: 150, 4: 1746, 5: 14538}),
+    ('open middlegame', '1n1q1bn1/2p5/8/5N2/1p6/8/1rP1P1P1/4KBNR 8/8/5p2/7p/3P1P2/8/8/1R6 w',
+     {1: 32, 2: 37, 3: 619, 4: 11949, 5: 157037}),
+]
+
+
+def perft(position, depth, generator=Position.generate_moves):
+    """
+    Number of leaf nodes of the move tree of a Position to the given depth
+    """
+    moves = generator(position, position.side_to_move)
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        undo = position.make_move(move)
+        nodes += perft(position, depth - 1, generator)
+        position.unmake_move(move, undo)
+    return nodes
+
+
+def board_moves(board):
+    """
+    Moves of the side to move found through the Piece move iterators and
+    Board.is_valid_move, captures only when any capture exists (quiet moves
+    are then not generated)
+    """
+    for kind in ('iter_captures', 'iter_quiets'):
+        moves = []
+        for board_number, grid in ((1, board.board1), (2, board.board2)):
+            for x in range(8):
+                for y in range(8):
+                    piece = grid[x][y]
+                    if piece is None or piece.color != board.current_player:
+                        continue
+                    for end in getattr(piece, kind)(grid, (x, y)):
+                        if board.is_valid_move((x, y), end, board_number):
+                            moves.append((x, y, end, board_number))
+        if moves:
+            return moves
+    return []
+
+
+def perft_board(board, depth):
+    """
+    perft over a Board, making moves with move_piece and undo_last_move
+    """
+    moves = board_moves(board)
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        board.move_piece((move[0], move[1]), move[2], move[3])
+        nodes += perft_board(board, depth - 1)
+        board.undo_last_move()
+    return nodes
+
+
+# 'board' goes through pieces.py and Board instead of a Position generator,
+# 'board-bitboard' too with bitboards behind the Board's rule checks
+GENERATORS = {
+    'array': Position.generate_moves,
+    'bitboard': bitboards.generate_moves,
+    'board': None,
+    'board-bitboard': None,
+}
+BOARD_GENERATORS = {
+    'board': None,
+    'board-bitboard': bitboards.generate_all_moves,
+}
+
+
+def load_board(text, move_generator=None):
+    board = Board(move_generator)
+    board.set_position(Position.from_text(text))
+    return board
+
+
+def run_perft(generator_name, text, depth):
+    """
+    perft of a position given as text with one of the GENERATORS
+    """
+    if generator_name in BOARD_GENERATORS:
+        return perft_board(load_board(text, BOARD_GENERATORS[generator_name]), depth)
+    return perft(Position.from_text(text), depth, GENERATORS[generator_name])
+
+
+def divide(text, depth, generator_name='array'):
+    """
+    Print the perft count below each move of a position and the total
+    """
+    position = Position.from_text(text)
+    if generator_name in BOARD_GENERATORS:
+        moves = board_moves(load_board(text, BOARD_GENERATORS[generator_name]))
+    else:
+        moves = GENERATORS[generator_name](position, position.side_to_move)
+
+    total = 0
+    for move in sorted(moves, key=format_move):
+        undo = position.make_move(move)
+        nodes = run_perft(generator_name, position.to_text(), depth - 1) if depth > 1 else 1
+        position.unmake_move(move, undo)
+        total += nodes
+        print(f"{format_move(move)}: {nodes}")
+    print(f"Total: {total}")
+    return total
+
+
+def check(max_depth, generator_names):
+    """
+    Compare every generator against the reference counts; returns True if
+    all match
+    """
+    ok = True
+    for name, text, expected in POSITIONS:
+        for depth in sorted(expected):
+            if depth > max_depth:
+                continue
+            for generator_name in generator_names:
+                nodes = run_perft(generator_name, text, depth)
+                status = 'ok' if nodes == expected[depth] else f"FAIL (expected {expected[depth]})"
+                if nodes != expected[depth]:
+                    ok = False
+                print(f"{name:<18} depth {depth} {generator_name:<14} {nodes:>9} {status}")
+    return ok
+
+
+def benchmark(depth, generator_names):
+    """
+    Print nodes per second of each generator over all reference positions
+    """
+    for generator_name in generator_names:
+        total_nodes = 0
+        start = time.perf_counter()
+        for _, text, _ in POSITIONS:
+            total_nodes += run_perft(generator_name, text, depth)
+        elapsed = time.perf_counter() - start
+        print(f"{generator_name:<14} {total_nodes:>9} nodes {elapsed:8.3f} s {total_nodes / elapsed:12.0f} nodes/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft for Alice suicide chess")
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--generator', action='append', choices=sorted(GENERATORS))
+    parser.add_argument('--divide', nargs=2, type=int, metavar=('POSITION', 'DEPTH'))
+    parser.add_argument('--bench', action='store_true')
+    args = parser.parse_args()
+    generator_names = args.generator or sorted(GENERATORS)
+
+    if args.divide:
+        index, depth = args.divide
+        divide(POSITIONS[index][1], depth, generator_names[0])
+    elif args.bench:
+        benchmark(args.depth, generator_names)
+    elif not check(args.depth, generator_names):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,202 +1,262 @@
-import copy
+KNIGHT_STEPS = ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2))
+KING_STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+ROOK_DIRECTIONS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+BISHOP_DIRECTIONS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+
+def _build_rays(directions):
+    """
+    Per square index (x * 8 + y), the non-empty rays of squares in each direction
+    """
+    table = []
+    for x in range(8):
+        for y in range(8):
+            rays = []
+            for dx, dy in directions:
+                ray = []
+                nx, ny = x + dx, y + dy
+                while 0 <= nx < 8 and 0 <= ny < 8:
+                    ray.append((nx, ny))
+                    nx += dx
+                    ny += dy
+                if ray:
+                    rays.append(tuple(ray))
+            table.append(tuple(rays))
+    return tuple(table)
+
+def _build_jumps(steps):
+    """
+    Per square index, the on-board squares reached by each step
+    """
+    return tuple(
+        tuple((x + dx, y + dy) for dx, dy in steps if 0 <= x + dx < 8 and 0 <= y + dy < 8)
+        for x in range(8) for y in range(8)
+    )
+
+def _build_pawn_tables(direction):
+    pushes = []
+    double_pushes = []
+    captures = []
+    for x in range(8):
+        for y in range(8):
+            pushes.append(((x + direction, y),) if 0 <= x + direction < 8 else ())
+            double_pushes.append(((x + 2 * direction, y),) if 0 <= x + 2 * direction < 8 else ())
+            captures.append(tuple(
+                (x + direction, ny) for ny in (y - 1, y + 1)
+                if 0 <= x + direction < 8 and 0 <= ny < 8
+            ))
+    return tuple(pushes), tuple(double_pushes), tuple(captures)
+
+# Move tables built once at import and shared by every move generator
+ROOK_RAYS = _build_rays(ROOK_DIRECTIONS)
+BISHOP_RAYS = _build_rays(BISHOP_DIRECTIONS)
+QUEEN_RAYS = _build_rays(QUEEN_DIRECTIONS)
+KNIGHT_TARGETS = _build_jumps(KNIGHT_STEPS)
+KING_TARGETS = _build_jumps(KING_STEPS)
+PAWN_PUSHES = {}
+PAWN_DOUBLE_PUSHES = {}
+PAWN_CAPTURES = {}
+for _color, _direction in (('white', -1), ('black', 1)):
+    PAWN_PUSHES[_color], PAWN_DOUBLE_PUSHES[_color], PAWN_CAPTURES[_color] = _build_pawn_tables(_direction)
+del _color, _direction
+
+def slide_moves(board, rays, color):
+    """
+    Squares reached along precomputed rays, stopping at the first piece
+    (included when it is an enemy)
+    """
+    moves = []
+    for ray in rays:
+        for square in ray:
+            piece = board[square[0]][square[1]]
+            if piece is None:
+                moves.append(square)
+            else:
+                if piece.color != color:
+                    moves.append(square)
+                break
+    return moves
+
+def jump_moves(board, targets, color):
+    """
+    Precomputed target squares that are empty or hold an enemy piece
+    """
+    moves = []
+    for square in targets:
+        piece = board[square[0]][square[1]]
+        if piece is None or piece.color != color:
+            moves.append(square)
+    return moves
+
+def slide_captures(board, rays, color):
+    """
+    Lazily yield the first piece of each ray when it is an enemy
+    """
+    for ray in rays:
+        for square in ray:
+            piece = board[square[0]][square[1]]
+            if piece is not None:
+                if piece.color != color:
+                    yield square
+                break
+
+def slide_quiets(board, rays):
+    """
+    Lazily yield the empty squares of each ray up to the first piece
+    """
+    for ray in rays:
+        for square in ray:
+            if board[square[0]][square[1]] is not None:
+                break
+            yield square
+
+def jump_captures(board, targets, color):
+    """
+    Lazily yield the precomputed targets holding an enemy piece
+    """
+    for square in targets:
+        piece = board[square[0]][square[1]]
+        if piece is not None and piece.color != color:
+            yield square
+
+def jump_quiets(board, targets):
+    """
+    Lazily yield the precomputed targets that are empty
+    """
+    for square in targets:
+        if board[square[0]][square[1]] is None:
+            yield square
+
+# Row where each color's pawns start; a pawn can never return to it, so a
+# pawn on it has not moved yet
+PAWN_START_ROWS = {'white': 6, 'black': 1}
 
 class Piece:
-    def __init__(self, color, name):
-        self.color = color 
-        self.name = name
-        self.has_moved = False 
+    """
+    Immutable piece shared by every square holding it: calling a piece class
+    with a color always returns the same instance, so pieces can be compared
+    by identity and boards copied without copying pieces. Whether a piece has
+    moved is part of the position, not of the piece.
+    """
+    __slots__ = ('color',)
+    name = None
+    _instances = {}
+
+    def __new__(cls, color):
+        piece = Piece._instances.get((cls, color))
+        if piece is None:
+            piece = object.__new__(cls)
+            object.__setattr__(piece, 'color', color)
+            Piece._instances[(cls, color)] = piece
+        return piece
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __reduce__(self):
+        return type(self), (self.color,)
 
     def __repr__(self):
         return f"{self.color} {self.name}"
 
 class Pawn(Piece):
-    def __init__(self, color):
-        super().__init__(color, 'Pawn')
-        self.direction = -1 if color == 'white' else 1
+    __slots__ = ()
+    name = 'Pawn'
 
     def get_possible_moves(self, board, current_position):
         moves = []
-        x, y = current_position
+        square = current_position[0] * 8 + current_position[1]
         
-        forward_move = (x + self.direction, y)
-        if self._is_valid_move(board, forward_move):
-            moves.append(forward_move)
+        for move in PAWN_PUSHES[self.color][square]:
+            if board[move[0]][move[1]] is None:
+                moves.append(move)
         
-        if not self.has_moved:
-            double_forward_move = (x + 2 * self.direction, y)
-            if self._is_valid_move(board, double_forward_move):
-                moves.append(double_forward_move)
+        if current_position[0] == PAWN_START_ROWS[self.color]:
+            for move in PAWN_DOUBLE_PUSHES[self.color][square]:
+                if board[move[0]][move[1]] is None:
+                    moves.append(move)
         
-        capture_moves = [
-            (x + self.direction, y - 1),
-            (x + self.direction, y + 1)
-        ]
-        for move in capture_moves:
-            if self._is_valid_capture(board, move):
+        for move in PAWN_CAPTURES[self.color][square]:
+            piece = board[move[0]][move[1]]
+            if piece is not None and piece.color != self.color:
                 moves.append(move)
         
         return moves
 
-    def _is_valid_move(self, board, move):
-        x, y = move
-        if x < 0 or x >= 8 or y < 0 or y >= 8:
-            return False
-        
-        return board[x][y] is None
+    def iter_captures(self, board, current_position):
+        square = current_position[0] * 8 + current_position[1]
+        return jump_captures(board, PAWN_CAPTURES[self.color][square], self.color)
 
-    def _is_valid_capture(self, board, move):
-        x, y = move
-        if x < 0 or x >= 8 or y < 0 or y >= 8:
-            return False
-        
-        piece = board[x][y]
-        return piece is not None and piece.color != self.color
+    def iter_quiets(self, board, current_position):
+        square = current_position[0] * 8 + current_position[1]
+        yield from jump_quiets(board, PAWN_PUSHES[self.color][square])
+        if current_position[0] == PAWN_START_ROWS[self.color]:
+            yield from jump_quiets(board, PAWN_DOUBLE_PUSHES[self.color][square])
 
 class Rook(Piece):
-    def __init__(self, color):
-        super().__init__(color, 'Rook')
+    __slots__ = ()
+    name = 'Rook'
 
     def get_possible_moves(self, board, current_position):
-        moves = []
-        x, y = current_position
-        
-        directions = [
-            (0, 1),   
-            (0, -1),  
-            (1, 0),  
-            (-1, 0)  
-        ]
-        
-        for dx, dy in directions:
-            new_x, new_y = x + dx, y + dy
-            
-            while 0 <= new_x < 8 and 0 <= new_y < 8:
-                if board[new_x][new_y] is None:
-                    moves.append((new_x, new_y))
-                else:
-                    if board[new_x][new_y].color != self.color:
-                        moves.append((new_x, new_y))
-                    break
-                
-                new_x += dx
-                new_y += dy
-        
-        return moves
+        return slide_moves(board, ROOK_RAYS[current_position[0] * 8 + current_position[1]], self.color)
+
+    def iter_captures(self, board, current_position):
+        return slide_captures(board, ROOK_RAYS[current_position[0] * 8 + current_position[1]], self.color)
+
+    def iter_quiets(self, board, current_position):
+        return slide_quiets(board, ROOK_RAYS[current_position[0] * 8 + current_position[1]])
 
 class Knight(Piece):
-    def __init__(self, color):
-        super().__init__(color, 'Knight')
+    __slots__ = ()
+    name = 'Knight'
 
     def get_possible_moves(self, board, current_position):
-        moves = []
-        x, y = current_position
-        
-        knight_moves = [
-            (x+2, y+1), (x+2, y-1),
-            (x-2, y+1), (x-2, y-1),
-            (x+1, y+2), (x+1, y-2),
-            (x-1, y+2), (x-1, y-2)
-        ]
-        
-        for move in knight_moves:
-            nx, ny = move
-            if 0 <= nx < 8 and 0 <= ny < 8:
-                piece = board[nx][ny]
-                if piece is None or piece.color != self.color:
-                    moves.append(move)
-        
-        return moves
+        return jump_moves(board, KNIGHT_TARGETS[current_position[0] * 8 + current_position[1]], self.color)
+
+    def iter_captures(self, board, current_position):
+        return jump_captures(board, KNIGHT_TARGETS[current_position[0] * 8 + current_position[1]], self.color)
+
+    def iter_quiets(self, board, current_position):
+        return jump_quiets(board, KNIGHT_TARGETS[current_position[0] * 8 + current_position[1]])
 
 class Bishop(Piece):
-    def __init__(self, color):
-        super().__init__(color, 'Bishop')
+    __slots__ = ()
+    name = 'Bishop'
 
     def get_possible_moves(self, board, current_position):
-        moves = []
-        x, y = current_position
-        
-        directions = [
-            (1, 1),  
-            (1, -1), 
-            (-1, 1),  
-            (-1, -1)  
-        ]
-        
-        for dx, dy in directions:
-            new_x, new_y = x + dx, y + dy
-            
-            while 0 <= new_x < 8 and 0 <= new_y < 8:
-                if board[new_x][new_y] is None:
-                    moves.append((new_x, new_y))
-                else:
-                    if board[new_x][new_y].color != self.color:
-                        moves.append((new_x, new_y))
-                    break
-                
-                new_x += dx
-                new_y += dy
-        
-        return moves
+        return slide_moves(board, BISHOP_RAYS[current_position[0] * 8 + current_position[1]], self.color)
+
+    def iter_captures(self, board, current_position):
+        return slide_captures(board, BISHOP_RAYS[current_position[0] * 8 + current_position[1]], self.color)
+
+    def iter_quiets(self, board, current_position):
+        return slide_quiets(board, BISHOP_RAYS[current_position[0] * 8 + current_position[1]])
 
 class Queen(Piece):
-    def __init__(self, color):
-        super().__init__(color, 'Queen')
+    __slots__ = ()
+    name = 'Queen'
 
     def get_possible_moves(self, board, current_position):
-        moves = []
-        x, y = current_position
-        
-        directions = [
-            (0, 1),   
-            (0, -1),  
-            (1, 0),   
-            (-1, 0),  
-            (1, 1),   
-            (1, -1),  
-            (-1, 1),  
-            (-1, -1)  
-        ]
-        
-        for dx, dy in directions:
-            new_x, new_y = x + dx, y + dy
-            
-            while 0 <= new_x < 8 and 0 <= new_y < 8:
-                if board[new_x][new_y] is None:
-                    moves.append((new_x, new_y))
-                else:
-                    if board[new_x][new_y].color != self.color:
-                        moves.append((new_x, new_y))
-                    break
-                
-                new_x += dx
-                new_y += dy
-        
-        return moves
+        return slide_moves(board, QUEEN_RAYS[current_position[0] * 8 + current_position[1]], self.color)
+
+    def iter_captures(self, board, current_position):
+        return slide_captures(board, QUEEN_RAYS[current_position[0] * 8 + current_position[1]], self.color)
+
+    def iter_quiets(self, board, current_position):
+        return slide_quiets(board, QUEEN_RAYS[current_position[0] * 8 + current_position[1]])
 
 class King(Piece):
-    def __init__(self, color):
-        super().__init__(color, 'King')
+    __slots__ = ()
+    name = 'King'
 
     def get_possible_moves(self, board, current_position):
-        moves = []
-        x, y = current_position
-        
-        king_moves = [
-            (x+1, y), (x-1, y),
-            (x, y+1), (x, y-1),
-            (x+1, y+1), (x+1, y-1),
-            (x-1, y+1), (x-1, y-1)
-        ]
-        
-        for move in king_moves:
-            nx, ny = move
-            if 0 <= nx < 8 and 0 <= ny < 8:
-                piece = board[nx][ny]
-                if piece is None or piece.color != self.color:
-                    moves.append(move)
-        
-        
-        return moves
+        return jump_moves(board, KING_TARGETS[current_position[0] * 8 + current_position[1]], self.color)
+
+    def iter_captures(self, board, current_position):
+        return jump_captures(board, KING_TARGETS[current_position[0] * 8 + current_position[1]], self.color)
+
+    def iter_quiets(self, board, current_position):
+        return jump_quiets(board, KING_TARGETS[current_position[0] * 8 + current_position[1]])
 
 def create_initial_board():
     board = [[None for _ in range(8)] for _ in range(8)]
@@ -227,6 +287,3 @@ def create_initial_board():
     board[7][4] = King('white')
     
     return board
-
-board = create_initial_board()
-print("Tablero de ajedrez inicializado")
\ No newline at end of file
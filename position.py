@@ -0,0 +1,409 @@
+import random
+
+from pieces import (
+    Pawn, Knight, Bishop, Rook, Queen, King,
+    ROOK_RAYS, BISHOP_RAYS, QUEEN_RAYS, KNIGHT_TARGETS, KING_TARGETS,
+    PAWN_PUSHES, PAWN_DOUBLE_PUSHES, PAWN_CAPTURES, PAWN_START_ROWS
+)
+
+EMPTY = 0
+PAWN = 1
+KNIGHT = 2
+BISHOP = 3
+ROOK = 4
+QUEEN = 5
+KING = 6
+TYPE_MASK = 7
+BLACK = 8
+MOVED = 16
+
+SIDE_TO_MOVE = 128
+
+PIECE_NAMES = (None, 'Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King')
+PIECE_TYPES = {name: piece_type for piece_type, name in enumerate(PIECE_NAMES) if name}
+PIECE_CLASSES = (None, Pawn, Knight, Bishop, Rook, Queen, King)
+PIECE_LETTERS = '.PNBRQK'
+FILES = 'abcdefgh'
+
+SLIDER_RAYS = {ROOK: ROOK_RAYS, BISHOP: BISHOP_RAYS, QUEEN: QUEEN_RAYS}
+JUMP_TARGETS = {KNIGHT: KNIGHT_TARGETS, KING: KING_TARGETS}
+
+# Zobrist keys, one per (square, byte code) plus the side to move. A fixed
+# seed keeps keys identical across processes.
+_zobrist_random = random.Random(20240229)
+ZOBRIST = [_zobrist_random.getrandbits(64) for _ in range(SIDE_TO_MOVE * 32)]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+del _zobrist_random
+
+
+def square_index(board_number, x, y):
+    """
+    Index of square (x, y) of a board inside the 128-square layout
+    """
+    return (board_number - 1) * 64 + x * 8 + y
+
+
+def encode_piece(piece, x=None):
+    """
+    Byte code of a Piece on row x (type, color and, for pawns off their
+    starting row, the moved flag)
+    """
+    if piece is None:
+        return EMPTY
+    code = PIECE_TYPES[piece.name]
+    if piece.color == 'black':
+        code |= BLACK
+    if code & TYPE_MASK == PAWN and x is not None and x != PAWN_START_ROWS[piece.color]:
+        code |= MOVED
+    return code
+
+
+def decode_piece(code):
+    """
+    Shared Piece instance of a byte code
+    """
+    if not code:
+        return None
+    return PIECE_CLASSES[code & TYPE_MASK]('black' if code & BLACK else 'white')
+
+
+def square_name(square):
+    """
+    Algebraic name of an (x, y) square; row 0 is rank 8, column 0 file a
+    """
+    return f"{FILES[square[1]]}{8 - square[0]}"
+
+
+def parse_square(name):
+    """
+    (x, y) square of an algebraic name such as 'e2'
+    """
+    return 8 - int(name[1]), FILES.index(name[0])
+
+
+def format_move(move):
+    """
+    Text form of a move: board number, origin and destination, e.g. '1e2e4'
+    """
+    x, y, end, board_number = move
+    return f"{board_number}{square_name((x, y))}{square_name(end)}"
+
+
+def parse_move(text):
+    """
+    Move tuple (x, y, (fx, fy), board) from its text form
+    """
+    if len(text) != 5 or text[0] not in '12':
+        raise ValueError(f"Invalid move: {text}")
+    x, y = parse_square(text[1:3])
+    return x, y, parse_square(text[3:5]), int(text[0])
+
+
+class Position:
+    """
+    Both Alice boards packed in a single byte array.
+
+    Bytes 0-63 hold board 1 and 64-127 board 2 (row-major, same (x, y)
+    coordinates as Board), byte 128 holds the side to move (0 white, 1 black).
+    Copying a position is a single buffer copy. key is the Zobrist hash of
+    the position, kept up to date by make_move/unmake_move.
+    """
+
+    __slots__ = ('squares', 'key')
+
+    def __init__(self, squares=None, key=None):
+        if squares is None:
+            self.squares = bytearray(SIDE_TO_MOVE + 1)
+        else:
+            self.squares = bytearray(squares)
+        self.key = self.compute_key() if key is None else key
+
+    def compute_key(self):
+        """
+        Zobrist hash computed from scratch
+        """
+        squares = self.squares
+        key = ZOBRIST_BLACK_TO_MOVE if squares[SIDE_TO_MOVE] else 0
+        for index in range(SIDE_TO_MOVE):
+            code = squares[index]
+            if code:
+                key ^= ZOBRIST[index * 32 + code]
+        return key
+
+    @classmethod
+    def from_boards(cls, board1, board2, current_player='white'):
+        position = cls()
+        squares = position.squares
+        for board_number, board in ((1, board1), (2, board2)):
+            for x in range(8):
+                for y in range(8):
+                    squares[square_index(board_number, x, y)] = encode_piece(board[x][y], x)
+        squares[SIDE_TO_MOVE] = 1 if current_player == 'black' else 0
+        position.key = position.compute_key()
+        return position
+
+    @classmethod
+    def from_board(cls, board_instance):
+        return cls.from_boards(board_instance.board1, board_instance.board2,
+                               board_instance.current_player)
+
+    @classmethod
+    def initial(cls):
+        from pieces import create_initial_board
+        return cls.from_boards(create_initial_board(),
+                               [[None for _ in range(8)] for _ in range(8)])
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Parse the to_text format: one FEN-like placement per board (rows
+        x = 0..7 separated by '/') and 'w' or 'b' for the side to move.
+        Pawns off their starting row are marked as moved.
+        """
+        fields = text.split()
+        if len(fields) != 3 or fields[2] not in ('w', 'b'):
+            raise ValueError(f"Invalid position: {text}")
+        position = cls()
+        squares = position.squares
+        for board_number, placement in ((1, fields[0]), (2, fields[1])):
+            rows = placement.split('/')
+            if len(rows) != 8:
+                raise ValueError(f"Invalid position: {text}")
+            for x, row in enumerate(rows):
+                y = 0
+                for char in row:
+                    if char.isdigit():
+                        y += int(char)
+                        continue
+                    if y >= 8 or char.upper() not in PIECE_LETTERS[1:]:
+                        raise ValueError(f"Invalid position: {text}")
+                    code = PIECE_LETTERS.index(char.upper())
+                    if char.islower():
+                        code |= BLACK
+                    if code & TYPE_MASK == PAWN and x != (1 if code & BLACK else 6):
+                        code |= MOVED
+                    squares[square_index(board_number, x, y)] = code
+                    y += 1
+                if y != 8:
+                    raise ValueError(f"Invalid position: {text}")
+        squares[SIDE_TO_MOVE] = 1 if fields[2] == 'b' else 0
+        position.key = position.compute_key()
+        return position
+
+    def to_text(self):
+        """
+        Compact text form of both boards and the side to move
+        """
+        fields = []
+        for board_number in (1, 2):
+            rows = []
+            for x in range(8):
+                row = ''
+                empty = 0
+                for y in range(8):
+                    code = self.squares[square_index(board_number, x, y)]
+                    if not code:
+                        empty += 1
+                        continue
+                    if empty:
+                        row += str(empty)
+                        empty = 0
+                    letter = PIECE_LETTERS[code & TYPE_MASK]
+                    row += letter.lower() if code & BLACK else letter
+                if empty:
+                    row += str(empty)
+                rows.append(row)
+            fields.append('/'.join(rows))
+        fields.append('b' if self.squares[SIDE_TO_MOVE] else 'w')
+        return ' '.join(fields)
+
+    def copy(self):
+        return Position(self.squares, self.key)
+
+    def __eq__(self, other):
+        return isinstance(other, Position) and self.squares == other.squares
+
+    def __hash__(self):
+        return hash(bytes(self.squares))
+
+    def __repr__(self):
+        return f"Position({bytes(self.squares).hex()})"
+
+    @property
+    def side_to_move(self):
+        return 'black' if self.squares[SIDE_TO_MOVE] else 'white'
+
+    def piece_at(self, board_number, position):
+        """
+        Byte code of the piece on a square (0 if empty)
+        """
+        return self.squares[square_index(board_number, position[0], position[1])]
+
+    def to_boards(self):
+        """
+        Expand into two 8x8 grids of Piece instances
+        """
+        boards = []
+        for board_number in (1, 2):
+            boards.append([
+                [decode_piece(self.squares[square_index(board_number, x, y)]) for y in range(8)]
+                for x in range(8)
+            ])
+        return boards[0], boards[1]
+
+    def iter_captures(self, color=None):
+        """
+        Lazily yield the Alice captures (x, y, (fx, fy), board) of a color,
+        in the same order as Piece.get_possible_moves over both boards
+        """
+        if color is None:
+            color = self.side_to_move
+        own = BLACK if color == 'black' else 0
+        pawn_captures = PAWN_CAPTURES[color]
+        squares = self.squares
+
+        for board_number, base, other in ((1, 0, 64), (2, 64, 0)):
+            for square in range(64):
+                piece = squares[base + square]
+                if not piece or piece & BLACK != own:
+                    continue
+                x, y = divmod(square, 8)
+                piece_type = piece & TYPE_MASK
+
+                if piece_type == PAWN or piece_type == KNIGHT or piece_type == KING:
+                    targets = pawn_captures[square] if piece_type == PAWN else JUMP_TARGETS[piece_type][square]
+                    for target in targets:
+                        offset = target[0] * 8 + target[1]
+                        code = squares[base + offset]
+                        if code and code & BLACK != own and not squares[other + offset]:
+                            yield x, y, target, board_number
+                else:
+                    for ray in SLIDER_RAYS[piece_type][square]:
+                        for target in ray:
+                            offset = target[0] * 8 + target[1]
+                            code = squares[base + offset]
+                            if code:
+                                if code & BLACK != own and not squares[other + offset]:
+                                    yield x, y, target, board_number
+                                break
+
+    def iter_quiets(self, color=None):
+        """
+        Lazily yield the Alice non-capturing moves of a color
+        """
+        if color is None:
+            color = self.side_to_move
+        own = BLACK if color == 'black' else 0
+        pawn_pushes = PAWN_PUSHES[color]
+        pawn_double_pushes = PAWN_DOUBLE_PUSHES[color]
+        squares = self.squares
+
+        for board_number, base, other in ((1, 0, 64), (2, 64, 0)):
+            for square in range(64):
+                piece = squares[base + square]
+                if not piece or piece & BLACK != own:
+                    continue
+                x, y = divmod(square, 8)
+                piece_type = piece & TYPE_MASK
+
+                if piece_type == PAWN:
+                    targets = pawn_pushes[square]
+                    if not piece & MOVED:
+                        targets = targets + pawn_double_pushes[square]
+                    for target in targets:
+                        offset = target[0] * 8 + target[1]
+                        if not squares[base + offset] and not squares[other + offset]:
+                            yield x, y, target, board_number
+                elif piece_type == KNIGHT or piece_type == KING:
+                    for target in JUMP_TARGETS[piece_type][square]:
+                        offset = target[0] * 8 + target[1]
+                        if not squares[base + offset] and not squares[other + offset]:
+                            yield x, y, target, board_number
+                else:
+                    for ray in SLIDER_RAYS[piece_type][square]:
+                        for target in ray:
+                            offset = target[0] * 8 + target[1]
+                            if squares[base + offset]:
+                                break
+                            if not squares[other + offset]:
+                                yield x, y, target, board_number
+
+    def has_capture(self, color=None):
+        """
+        Whether a color has any capture, stopping at the first one found
+        """
+        return next(self.iter_captures(color), None) is not None
+
+    def has_move(self, color=None):
+        """
+        Whether a color has any move at all, stopping at the first one found
+        """
+        return (next(self.iter_captures(color), None) is not None
+                or next(self.iter_quiets(color), None) is not None)
+
+    def generate_all_moves(self, color=None):
+        """
+        All Alice moves (x, y, (fx, fy), board) for a color, as a pair of
+        lists (captures, quiet moves)
+        """
+        return list(self.iter_captures(color)), list(self.iter_quiets(color))
+
+    def generate_moves(self, color=None):
+        """
+        Alice moves (x, y, (fx, fy), board) for a color, captures only when
+        any capture exists (quiet moves are then never generated)
+        """
+        capture_moves = list(self.iter_captures(color))
+        return capture_moves if capture_moves else list(self.iter_quiets(color))
+
+    def make_move(self, move):
+        """
+        Apply an Alice move in place and return the undo information
+        """
+        x, y, end, board_number = move
+        base = 0 if board_number == 1 else 64
+        squares = self.squares
+        start = base + x * 8 + y
+        offset = end[0] * 8 + end[1]
+        target = base + offset
+        transfer = (64 - base) + offset
+
+        piece = squares[start]
+        captured = squares[target]
+        key = self.key
+        new_key = key ^ ZOBRIST[start * 32 + piece] ^ ZOBRIST_BLACK_TO_MOVE
+        if captured:
+            new_key ^= ZOBRIST[target * 32 + captured]
+        # Only pawns carry the moved flag, so a position's bytes depend on
+        # where the pieces stand and not on how they got there
+        moved = piece | MOVED if piece & TYPE_MASK == PAWN else piece
+        squares[start] = EMPTY
+        if squares[transfer]:
+            squares[target] = moved
+            new_key ^= ZOBRIST[target * 32 + moved]
+        else:
+            squares[target] = EMPTY
+            squares[transfer] = moved
+            new_key ^= ZOBRIST[transfer * 32 + moved]
+        squares[SIDE_TO_MOVE] ^= 1
+        self.key = new_key
+
+        return piece, captured, key
+
+    def unmake_move(self, move, undo):
+        """
+        Restore the position exactly as it was before make_move
+        """
+        x, y, end, board_number = move
+        base = 0 if board_number == 1 else 64
+        squares = self.squares
+        offset = end[0] * 8 + end[1]
+        target = base + offset
+        piece, captured, key = undo
+
+        if not squares[target]:
+            squares[(64 - base) + offset] = EMPTY
+        squares[target] = captured
+        squares[base + x * 8 + y] = piece
+        squares[SIDE_TO_MOVE] ^= 1
+        self.key = key
@@ -0,0 +1,138 @@
+import time
+
+# ChessAI methods timed when instrumentation is on, and the phase they count in
+TIMED_METHODS = (
+    ('get_all_possible_moves', 'move_generation'),
+    ('order_moves', 'move_ordering'),
+    ('make_move', 'make_unmake'),
+    ('unmake_move', 'make_unmake'),
+)
+
+
+class SearchStats:
+    """
+    Counters and per-phase timings of one ChessAI.choose_best_move call.
+
+    Node and cutoff counters are always kept by the search; phase timings
+    are only measured while instrument() has wrapped the AI's hot-path
+    methods, so a search without stats pays nothing for them. In a parallel
+    search the workers' counters and timings are added up (add_worker), so
+    timings are CPU time summed over processes and can exceed elapsed.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.qnodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.depth_reached = 0
+        self.iteration_nodes = []
+        self.elapsed = 0.0
+        self.timings = {phase: 0.0 for _, phase in TIMED_METHODS}
+        self.timings['evaluation'] = 0.0
+
+    @property
+    def first_move_cutoff_ratio(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def branching_factor(self):
+        """
+        Effective branching factor: growth of the node count between the
+        last two iterations, or nodes ** (1 / depth) for a single one
+        """
+        if len(self.iteration_nodes) >= 2 and self.iteration_nodes[-2]:
+            return self.iteration_nodes[-1] / self.iteration_nodes[-2]
+        if self.depth_reached and self.nodes:
+            return self.nodes ** (1 / self.depth_reached)
+        return 0.0
+
+    def instrument(self, ai):
+        """
+        Wrap the hot-path methods of a ChessAI with timers; returns a
+        function that removes the wrappers
+        """
+        timings = self.timings
+
+        def timed(phase, function):
+            def wrapper(*args):
+                start = time.perf_counter()
+                try:
+                    return function(*args)
+                finally:
+                    timings[phase] += time.perf_counter() - start
+            return wrapper
+
+        for name, phase in TIMED_METHODS:
+            setattr(ai, name, timed(phase, getattr(ai, name)))
+
+        new_evaluation = ai.new_evaluation
+
+        def timed_new_evaluation(position):
+            evaluation = new_evaluation(position)
+            evaluation.score = timed('evaluation', evaluation.score)
+            return evaluation
+
+        ai.new_evaluation = timed_new_evaluation
+        tt_probes = ai.transposition_table.probes
+        tt_hits = ai.transposition_table.hits
+
+        def restore():
+            for name, _ in TIMED_METHODS:
+                ai.__dict__.pop(name, None)
+            ai.__dict__.pop('new_evaluation', None)
+            self.tt_probes += ai.transposition_table.probes - tt_probes
+            self.tt_hits += ai.transposition_table.hits - tt_hits
+
+        return restore
+
+    def add_worker(self, counters):
+        """
+        Add the table counters and timings a parallel search worker returned
+        for one root move
+        """
+        self.tt_probes += counters['tt_probes']
+        self.tt_hits += counters['tt_hits']
+        for phase, seconds in counters['timings'].items():
+            self.timings[phase] += seconds
+
+    def collect(self, ai, elapsed):
+        """
+        Copy the search counters of a ChessAI after a search
+        """
+        self.nodes = ai.nodes
+        self.qnodes = ai.qnodes
+        self.cutoffs = ai.cutoffs
+        self.first_move_cutoffs = ai.first_move_cutoffs
+        self.depth_reached = ai.depth_reached
+        self.iteration_nodes = list(ai.iteration_nodes)
+        self.elapsed = elapsed
+
+    def as_dict(self):
+        return {
+            'depth': self.depth_reached,
+            'nodes': self.nodes,
+            'qnodes': self.qnodes,
+            'nps': round(self.nodes_per_second),
+            'cutoffs': self.cutoffs,
+            'first_move_cutoff_ratio': round(self.first_move_cutoff_ratio, 3),
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'branching_factor': round(self.branching_factor, 2),
+            'elapsed': round(self.elapsed, 4),
+            'timings': {phase: round(seconds, 4) for phase, seconds in self.timings.items()},
+        }
+
+    def __str__(self):
+        timings = ' '.join(f"{phase}={seconds:.3f}s" for phase, seconds in self.timings.items())
+        return (f"depth={self.depth_reached} nodes={self.nodes} qnodes={self.qnodes} "
+                f"nps={self.nodes_per_second:.0f} cutoffs={self.cutoffs} "
+                f"first_move_cutoffs={self.first_move_cutoff_ratio:.1%} "
+                f"tt_hits={self.tt_hits}/{self.tt_probes} ebf={self.branching_factor:.2f} "
+                f"time={self.elapsed:.3f}s {timings}")
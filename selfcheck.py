@@ -0,0 +1,125 @@
+"""
+Self-checks of search and evaluation invariants on random positions.
+
+    python selfcheck.py                      every check
+    python selfcheck.py --check parallel     parallel root search = serial root search
+    python selfcheck.py --check batch        NumPy batch scores = evaluate_board (needs NumPy)
+    python selfcheck.py --positions 50       more random positions per check
+
+Exits with status 1 if any check fails.
+"""
+import argparse
+import random
+
+from ai import ChessAI
+from board import Board
+from position import format_move
+
+
+def random_boards(count, seed, max_plies=30):
+    """
+    Boards reached by random legal moves from the initial position, each
+    with at least one legal move left
+    """
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = Board()
+        for _ in range(rng.randint(0, max_plies)):
+            legal_moves = board.legal_moves()
+            if not legal_moves:
+                break
+            move = rng.choice(legal_moves)
+            board.move_piece((move[0], move[1]), move[2], move[3])
+        if board.has_legal_move():
+            boards.append(board)
+    return boards
+
+
+def check_parallel(boards, depth=3, workers=2):
+    """
+    search_root_parallel finds the same root value and, with the same
+    seed, the same move as search_root; returns True if all positions agree
+    """
+    ok = True
+    parallel = ChessAI(None, 'white', seed=0)
+    try:
+        for index, board in enumerate(boards):
+            serial = ChessAI(board, board.current_player, seed=0)
+            serial_move, serial_value = serial.search_root(
+                board.get_position(), list(board.legal_moves()), depth)
+
+            # A fresh table and seed per position, as for the serial search
+            parallel.new_game()
+            parallel.random.seed(0)
+            parallel.board_instance = board
+            parallel.color = board.current_player
+            parallel_move, parallel_value = parallel.search_root_parallel(
+                board.get_position(), list(board.legal_moves()), depth, workers)
+
+            if (serial_move, serial_value) != (parallel_move, parallel_value):
+                ok = False
+                print(f"parallel  position {index}: serial {format_move(serial_move)} {serial_value}, "
+                      f"parallel {format_move(parallel_move)} {parallel_value} FAIL")
+    finally:
+        parallel.close()
+    print(f"parallel  {len(boards)} positions at depth {depth}: {'ok' if ok else 'FAIL'}")
+    return ok
+
+
+def check_batch(boards):
+    """
+    ChessAI.evaluate_batch gives exactly the evaluate_board scores, for
+    every position of the boards' games, both colors and with default and
+    random piece-square weights; returns True if all scores agree
+    """
+    positions = []
+    for board in boards:
+        end = board.ply
+        for ply in range(end + 1):
+            board.seek(ply)
+            positions.append(board.get_position())
+        board.seek(end)
+
+    rng = random.Random(0)
+    ai = ChessAI(None, 'white')
+    weights = [
+        ('default weights', None, ai.piece_count_bonus),
+        ('random tables', {name: [rng.randint(-20, 20) for _ in range(128)] for name in ai.piece_values},
+         rng.randint(-50, 50)),
+    ]
+    ok = True
+    for label, tables, bonus in weights:
+        ai.piece_square_tables = tables
+        ai.piece_count_bonus = bonus
+        for color in ('white', 'black'):
+            ai.color = color
+            expected = [ai.evaluate_board(position) for position in positions]
+            mismatches = sum(score != value for score, value in zip(ai.evaluate_batch(positions), expected))
+            ok = ok and not mismatches
+            print(f"batch     {len(positions)} positions, {label}, {color}: "
+                  f"{'ok' if not mismatches else f'{mismatches} FAIL'}")
+    return ok
+
+
+CHECKS = {
+    'batch': check_batch,
+    'parallel': check_parallel,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-checks of the Alice suicide chess engine")
+    parser.add_argument('--check', action='append', choices=sorted(CHECKS))
+    parser.add_argument('--positions', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    boards = random_boards(args.positions, args.seed)
+    results = [CHECKS[name](boards) for name in args.check or sorted(CHECKS)]
+    if not all(results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
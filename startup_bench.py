@@ -0,0 +1,116 @@
+"""
+Startup cost of the headless engine modules and of pooled worker processes.
+
+    python startup_bench.py               import times, side effects, worker spawn
+    python startup_bench.py --runs 20     more interpreter starts per measurement
+
+Fails (exit status 1) if importing the engine prints anything or loads
+tkinter or the GUI.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+HEADLESS_MODULES = ('pieces', 'position', 'board', 'ai', 'engine')
+GUI_MODULES = ('tkinter', 'gui')
+# The probes run with python -c, so they import the modules from here
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {modules}
+elapsed = time.perf_counter() - start
+loaded = [name for name in {gui_modules!r} if name in sys.modules]
+sys.stderr.write(f"{{elapsed}} {{','.join(loaded)}}\\n")
+"""
+
+
+def interpreter_start(code, runs):
+    """
+    Median wall time of a fresh interpreter running code, and the stdout
+    and stderr of the last run
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=REPO_DIR)
+        times.append(time.perf_counter() - start)
+        if result.returncode:
+            raise RuntimeError(result.stderr)
+    return statistics.median(times), result.stdout, result.stderr
+
+
+def measure_imports(runs):
+    """
+    Print interpreter start and import times; returns False on import side
+    effects
+    """
+    baseline, _, _ = interpreter_start('pass', runs)
+    print(f"{'python -c pass':<28} {baseline * 1000:8.1f} ms")
+
+    ok = True
+    for modules in HEADLESS_MODULES + (', '.join(HEADLESS_MODULES),):
+        code = IMPORT_PROBE.format(modules=modules, gui_modules=GUI_MODULES)
+        total, stdout, stderr = interpreter_start(code, runs)
+        import_time, _, loaded = stderr.strip().partition(' ')
+        problems = []
+        if stdout:
+            problems.append(f"prints {stdout.strip()!r}")
+        if loaded:
+            problems.append(f"loads {loaded}")
+        ok = ok and not problems
+        print(f"{'import ' + modules:<28} {total * 1000:8.1f} ms  (import {float(import_time) * 1000:6.1f} ms)"
+              f"  {'; '.join(problems) or 'no side effects'}")
+    return ok
+
+
+def _worker_ready():
+    import ai
+    return ai.__name__
+
+
+def measure_workers(workers):
+    """
+    Print the time to spawn a pool and get a first answer from each worker,
+    then the round trip of a task once the pool is warm
+    """
+    for method in ('spawn', 'fork'):
+        if method not in multiprocessing.get_all_start_methods():
+            continue
+        context = multiprocessing.get_context(method)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [executor.submit(_worker_ready) for _ in range(workers)]
+            for future in futures:
+                future.result()
+            cold = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rounds = 50
+            for _ in range(rounds):
+                executor.submit(_worker_ready).result()
+            warm = (time.perf_counter() - start) / rounds
+        print(f"{method:<6} pool of {workers}: first answers {cold * 1000:8.1f} ms, "
+              f"warm task {warm * 1000:6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup benchmark for the headless engine")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    ok = measure_imports(args.runs)
+    measure_workers(args.workers)
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Rough cost in bytes of one stored entry (slot pointer, entry tuple and its
+# integers), used to turn a memory budget into a number of slots.
+ENTRY_SIZE = 128
+
+
+class TranspositionTable:
+    """
+    Fixed-size hash table of search results indexed by Zobrist key.
+
+    Each slot holds (key, depth, score, flag, best_move). On collision the
+    entry searched to the greater depth is kept.
+    """
+
+    def __init__(self, size_mb=16):
+        self.size = max(1, int(size_mb * 1024 * 1024) // ENTRY_SIZE)
+        self.entries = [None] * self.size
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        """
+        Stored entry for key, or None
+        """
+        self.probes += 1
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key, depth, score, flag, best_move):
+        """
+        Store a result, replacing the slot only with an equal or deeper search
+        (or any result for the same position)
+        """
+        index = key % self.size
+        entry = self.entries[index]
+        if entry is None or entry[0] == key or depth >= entry[1]:
+            self.entries[index] = (key, depth, score, flag, best_move)
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.probes = 0
+        self.hits = 0
@@ -0,0 +1,254 @@
+"""
+Texel-style tuning of the evaluation weights from recorded games.
+
+    python tune.py games.agr more.pgn --output weights.json
+    python engine.py --weights weights.json      (or ChessAI(..., weights=...))
+
+Every quiet position (no capture available to the side to move) after the
+first --skip-plies plies of each game is labelled with the game result
+(1 white win, 0.5 draw, 0 black win). The evaluation of ChessAI is linear in
+its weights (piece_values, piece_count_bonus and a 128-square piece-square
+table per piece, see evaluation.Evaluation), so the score of all positions
+is one lookup-and-sum over their packed squares. Gradient descent (Adam)
+then minimizes the mean squared error between the results and
+1 / (1 + 10 ** (-K * score / 400)), after fitting K to the starting weights.
+Weights are rounded to integers at the end, since the search relies on
+integer scores.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from batch_eval import BatchEvaluation
+from evaluation import DEFAULT_PIECE_VALUES, DEFAULT_PIECE_COUNT_BONUS
+from gamerecord import read_games
+from position import PIECE_NAMES, BLACK, SIDE_TO_MOVE
+
+# Positions scored per vectorized step, bounding the temporary arrays
+CHUNK_SIZE = 1 << 16
+
+RESULT_SCORES = {'1-0': 1.0, '1/2-1/2': 0.5, '0-1': 0.0}
+# Piece types with weights (index 0 of PIECE_NAMES is unused)
+TUNED_TYPES = range(1, len(PIECE_NAMES))
+
+# Square of the same row as seen by black (mirrored x, same board and y)
+MIRROR = np.array([
+    board * 64 + (7 - x) * 8 + y
+    for board in range(2) for x in range(8) for y in range(8)
+])
+
+
+def load_positions(paths, skip_plies=8):
+    """
+    Packed quiet positions (N, 2, 8, 8) and the results of their games,
+    streamed from game record files
+    """
+    data = bytearray()
+    results = []
+    for path in paths:
+        for game in read_games(path):
+            if game.result not in RESULT_SCORES:
+                continue
+            skip = max(skip_plies, int(game.tags.get('OpeningPlies', 0)))
+            for ply, (position, _) in enumerate(game.positions()):
+                if ply < skip or position.has_capture():
+                    continue
+                data += position.squares[:SIDE_TO_MOVE]
+                results.append(RESULT_SCORES[game.result])
+    codes = np.frombuffer(bytes(data), dtype=np.uint8) & 15
+    return codes.astype(np.int8).reshape(-1, 2, 8, 8), np.array(results)
+
+
+class Weights:
+    """
+    Evaluation weights as arrays: values[type], bonus and pst[type, square]
+    (index 0 unused, like PIECE_NAMES)
+    """
+
+    def __init__(self, piece_values, piece_count_bonus=DEFAULT_PIECE_COUNT_BONUS, piece_square_tables=None):
+        self.values = np.zeros(len(PIECE_NAMES))
+        self.pst = np.zeros((len(PIECE_NAMES), SIDE_TO_MOVE))
+        for piece_type in TUNED_TYPES:
+            name = PIECE_NAMES[piece_type]
+            self.values[piece_type] = piece_values[name]
+            if piece_square_tables and name in piece_square_tables:
+                self.pst[piece_type] = piece_square_tables[name]
+        self.bonus = float(piece_count_bonus)
+
+    def table(self):
+        """
+        (128, 16) score contribution of each piece code on each square,
+        from white's point of view
+        """
+        table = np.zeros((SIDE_TO_MOVE, 16))
+        for piece_type in TUNED_TYPES:
+            table[:, piece_type] = self.values[piece_type] - self.bonus + self.pst[piece_type]
+            table[:, piece_type | BLACK] = -(self.values[piece_type] - self.bonus + self.pst[piece_type][MIRROR])
+        return table
+
+    def gradient(self, table_gradient):
+        """
+        Gradients of values, bonus and pst from the gradient of table()
+        """
+        values = np.zeros_like(self.values)
+        pst = np.zeros_like(self.pst)
+        for piece_type in TUNED_TYPES:
+            white = table_gradient[:, piece_type]
+            black = table_gradient[:, piece_type | BLACK]
+            values[piece_type] = white.sum() - black.sum()
+            pst[piece_type] = white - black[MIRROR]
+        bonus = -values.sum()
+        return values, bonus, pst
+
+    def as_dict(self):
+        """
+        Integer weights in the format of ChessAI.load_weights
+        """
+        return {
+            'piece_values': {PIECE_NAMES[t]: int(round(self.values[t])) for t in TUNED_TYPES},
+            'piece_count_bonus': int(round(self.bonus)),
+            'piece_square_tables': {
+                PIECE_NAMES[t]: [int(round(value)) for value in self.pst[t]] for t in TUNED_TYPES
+            },
+        }
+
+
+def scores(table, codes):
+    """
+    White's scores of positions given as (N, 128) piece codes
+    """
+    result = np.empty(len(codes))
+    for start in range(0, len(codes), CHUNK_SIZE):
+        chunk = codes[start:start + CHUNK_SIZE].astype(np.intp)
+        result[start:start + CHUNK_SIZE] = table[np.arange(SIDE_TO_MOVE), chunk].sum(axis=1)
+    return result
+
+
+def table_gradient(codes, slope):
+    """
+    Gradient of the summed scores with respect to every table entry, each
+    position weighted by slope
+    """
+    gradient = np.zeros(SIDE_TO_MOVE * 16)
+    offsets = np.arange(SIDE_TO_MOVE) * 16
+    for start in range(0, len(codes), CHUNK_SIZE):
+        chunk = codes[start:start + CHUNK_SIZE].astype(np.intp)
+        gradient += np.bincount((offsets + chunk).ravel(),
+                                weights=np.repeat(slope[start:start + CHUNK_SIZE], SIDE_TO_MOVE),
+                                minlength=SIDE_TO_MOVE * 16)
+    return gradient.reshape(SIDE_TO_MOVE, 16)
+
+
+def win_probability(score, k):
+    """
+    1 / (1 + 10 ** (-k * score / 400)), written with tanh so that large
+    scores do not overflow
+    """
+    return 0.5 * (1 + np.tanh(k * score * np.log(10) / 800))
+
+
+def error(score, results, k):
+    return np.mean((results - win_probability(score, k)) ** 2)
+
+
+def fit_k(score, results):
+    """
+    K minimizing the error of fixed scores, by a coarse log grid then
+    golden-section refinement
+    """
+    grid = np.logspace(-2, 2, 41)
+    best = grid[np.argmin([error(score, results, k) for k in grid])]
+    low, high = best / 1.3, best * 1.3
+    ratio = (5 ** 0.5 - 1) / 2
+    for _ in range(40):
+        a = high - ratio * (high - low)
+        b = low + ratio * (high - low)
+        if error(score, results, a) < error(score, results, b):
+            high = b
+        else:
+            low = a
+    return (low + high) / 2
+
+
+def tune(boards, results, weights, iterations=500, learning_rate=1.0, regularization=1e-6,
+         k=None, log=None):
+    """
+    Fit weights in place by gradient descent; returns (k, error before, error after)
+    """
+    codes = boards.reshape(len(boards), SIDE_TO_MOVE)
+    if k is None:
+        k = fit_k(scores(weights.table(), codes), results)
+    start_error = error(scores(weights.table(), codes), results, k)
+
+    moments = [np.zeros_like(weights.values), 0.0, np.zeros_like(weights.pst)]
+    squares = [np.zeros_like(weights.values), 0.0, np.zeros_like(weights.pst)]
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    for step in range(1, iterations + 1):
+        score = scores(weights.table(), codes)
+        probability = win_probability(score, k)
+        # d error / d score of every position
+        slope = (-2 / len(results)) * (results - probability) * probability * (1 - probability) \
+            * k * np.log(10) / 400
+        values, bonus, pst = weights.gradient(table_gradient(codes, slope))
+        pst += 2 * regularization * weights.pst
+
+        updates = []
+        for index, gradient in enumerate((values, bonus, pst)):
+            moments[index] = beta1 * moments[index] + (1 - beta1) * gradient
+            squares[index] = beta2 * squares[index] + (1 - beta2) * gradient ** 2
+            corrected = moments[index] / (1 - beta1 ** step)
+            updates.append(learning_rate * corrected / (np.sqrt(squares[index] / (1 - beta2 ** step)) + epsilon))
+        weights.values -= updates[0]
+        weights.values[0] = 0
+        weights.bonus -= updates[1]
+        weights.pst -= updates[2]
+        weights.pst[0] = 0
+
+        if log is not None and (step % 50 == 0 or step == iterations):
+            log(f"step {step:5d} error {error(score, results, k):.6f}")
+
+    return k, start_error, error(scores(weights.table(), codes), results, k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune ChessAI evaluation weights on recorded games")
+    parser.add_argument('games', nargs='+', help="game record files (gamerecord.py formats)")
+    parser.add_argument('--output', default='weights.json')
+    parser.add_argument('--weights', help="starting weights file (default: ChessAI defaults)")
+    parser.add_argument('--skip-plies', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--learning-rate', type=float, default=1.0)
+    parser.add_argument('--regularization', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    boards, results = load_positions(args.games, args.skip_plies)
+    print(f"{len(results)} positions loaded in {time.perf_counter() - start:.1f} s")
+    if not len(results):
+        raise SystemExit("no positions to tune on")
+
+    if args.weights:
+        with open(args.weights) as file:
+            initial = json.load(file)
+        weights = Weights(initial['piece_values'], initial.get('piece_count_bonus', DEFAULT_PIECE_COUNT_BONUS),
+                          initial.get('piece_square_tables'))
+    else:
+        weights = Weights(DEFAULT_PIECE_VALUES)
+
+    k, before, after = tune(boards, results, weights, args.iterations, args.learning_rate,
+                            args.regularization, log=print)
+    tuned = weights.as_dict()
+    # Error of the integer weights actually written, through the batch evaluator
+    final = BatchEvaluation(tuned['piece_values'], tuned['piece_count_bonus'], tuned['piece_square_tables'])
+    rounded = error(final.white_scores(boards), results, k)
+    print(f"K {k:.4f}: error {before:.6f} -> {after:.6f} ({rounded:.6f} rounded)")
+
+    with open(args.output, 'w') as file:
+        json.dump(tuned, file)
+    print(f"weights written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()